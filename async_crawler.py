@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from metrics import METRICS
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """Per-host token bucket plus a cap on requests in flight to each host.
+
+    With a throttle (see throttle.AdaptiveThrottle) the buckets refill at the
+    throttle's current rate instead of the fixed `rate`.
+    """
+
+    def __init__(self, rate, max_in_flight, burst=1, throttle=None):
+        self.rate = rate
+        self.throttle = throttle
+        self.max_in_flight = max_in_flight
+        self.burst = burst
+        self._buckets = {}
+        self._slots = {}
+
+    @asynccontextmanager
+    async def limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+            self._slots[host] = asyncio.Semaphore(self.max_in_flight)
+        start = time.perf_counter()
+        async with self._slots[host]:
+            if self.throttle:
+                self._buckets[host].rate = self.throttle.rate
+            await self._buckets[host].acquire()
+            METRICS.observe("rate_limit_wait", time.perf_counter() - start)
+            yield
+
+
+class AsyncFetcher:
+    """Runs blocking fetch/scrape calls on worker threads under a HostRateLimiter."""
+
+    def __init__(self, limiter, max_workers):
+        self.limiter = limiter
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def call(self, url, func, *args):
+        """Run func(*args) on a worker thread once the limiter admits a request to url."""
+        async with self.limiter.limit(url):
+            loop = asyncio.get_running_loop()
+            # Carry the task's context (e.g. its trace span) over to the worker thread
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, context.run, func, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
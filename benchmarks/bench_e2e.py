@@ -0,0 +1,235 @@
+"""
+End-to-end throughput of the full scraper against a local stand-in for amazon.in.
+
+    python benchmarks/bench_e2e.py                                  # http and async engines, 4 workers
+    python benchmarks/bench_e2e.py --engines async --workers 2,4,8 --latency-ms 150 --error-rate 0.05
+
+A local HTTP server serves bestseller grid pages and the saved product pages
+in fixtures/products/, with injected latency and errors. Each engine and
+worker count runs main() in a fresh process with --no-browser against that
+server, and reports pages/sec, p50/p95 page fetch latency, CPU time and peak
+RSS. Unix only (CPU and RSS come from the resource module).
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import multiprocessing
+import os
+import queue
+import random
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PRODUCT_GLOB = os.path.join(ROOT, "fixtures", "products", "*.html")
+PAGE_SIZE = 50
+
+GRID_ITEM = (
+    '<div id="gridItemRoot"><span class="zg-bdg-text">#{rank}</span>'
+    '<div class="zg-grid-general-faceout">'
+    '<a class="a-link-normal" href="/product-{asin}/dp/{asin}/ref=zg_bs_{rank}">'
+    '<img alt="Product {asin}" src="https://m.media-amazon.com/images/I/{asin}._AC_UL300_.jpg">'
+    '<div class="_cDEzb_p13n-sc-css-line-clamp-3_g3dy1">Product {asin}</div></a>'
+    '<i class="a-icon a-icon-star-small a-star-small-4"><span class="a-icon-alt">4.1 out of 5 stars</span></i>'
+    '<span class="_cDEzb_p13n-sc-price_3mJ9Z">{price}</span></div></div>'
+)
+
+
+def grid_page(path, page):
+    """A bestseller page with PAGE_SIZE products, the same ones every time for a given path."""
+    items = []
+    for index in range(PAGE_SIZE):
+        rank = (page - 1) * PAGE_SIZE + index + 1
+        digest = hashlib.sha1(f"{path}:{rank}".encode()).hexdigest().upper()
+        asin = "B0" + digest[:8]
+        price = 100 + int(digest[8:12], 16) % 5000
+        # Variant products show a price range on the grid
+        price = f"&#8377;{price}.00" if rank % 5 else f"&#8377;{price}.00 - &#8377;{price * 2}.00"
+        items.append(GRID_ITEM.format(rank=rank, asin=asin, price=price))
+    return f'<html><body><div role="tree"></div>{"".join(items)}</body></html>'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves grid pages for /gp/bestsellers/... and a saved product page for /dp/<ASIN>."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, Nagle would hold the body back for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        delay = max(0.0, random.gauss(server.latency, server.jitter))
+        time.sleep(delay)
+        if random.random() < server.error_rate:
+            self.respond(503, "<html><body>Service Unavailable</body></html>")
+            return
+        path, _, query = self.path.partition("?")
+        if path.startswith("/gp/bestsellers"):
+            page = int(re.search(r"(?:^|&)pg=(\d+)", query).group(1)) if "pg=" in query else 1
+            self.respond(200, grid_page(path.split("/ref=")[0], page))
+        elif "/dp/" in path:
+            # Every ASIN maps to one of the saved pages
+            asin = path.rsplit("/dp/", 1)[1][:10]
+            self.respond(200, server.products[int(hashlib.sha1(asin.encode()).hexdigest(), 16) % len(server.products)])
+        else:
+            self.respond(404, "<html><body>Not Found</body></html>")
+
+    def respond(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.errors += status != 200
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency_ms, jitter_ms, error_rate):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.jitter = jitter_ms / 1000
+    server.error_rate = error_rate
+    server.products = []
+    for path in sorted(glob.glob(PRODUCT_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            server.products.append(f.read())
+    server.lock = threading.Lock()
+    server.requests = server.errors = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_scraper(argv, results):
+    """Child process: run main() once and report fetch latencies and resource use."""
+    # Keep the scraper's log, journal and output out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix="bench_e2e_"))
+    import http_fetcher
+    import main as scraper
+
+    latencies = []
+
+    class TimedFetcher(http_fetcher.HttpFetcher):
+        def fetch_with_status(self, url):
+            start = time.perf_counter()
+            try:
+                return super().fetch_with_status(url)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    scraper.HttpFetcher = TimedFetcher
+    start = time.perf_counter()
+    scraper.main(argv)
+    elapsed = time.perf_counter() - start
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with open("output.csv", newline="", encoding="utf-8") as f:
+        records = sum(1 for _ in csv.DictReader(f))
+    results.put({
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "records": records,
+        "cpu": own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        # ru_maxrss is in KB on Linux
+        "rss_mb": max(own.ru_maxrss, children.ru_maxrss) / 1024,
+    })
+
+
+def wait_for_result(process, results, timeout):
+    """The child's result, or None if it exited without one (main() raised) or ran past `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if process.is_alive():
+                continue
+            # It may have put its result just before exiting
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                result = None
+        process.join()
+        return result
+    process.terminate()
+    process.join()
+    return None
+
+
+def percentile(values, fraction):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[int(fraction * 100) - 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="http,async", help="Comma-separated engines to run (default: http,async).")
+    parser.add_argument("--workers", default="4", help="Comma-separated worker counts to run (default: 4).")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mean injected response latency.")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Standard deviation of the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--limit", type=int, default=25, help="Products per category (0 for the full top 100).")
+    parser.add_argument(
+        "--rate", type=float, default=200,
+        help="Starting request rate passed to the scraper; --min-rate and --max-rate go to 1/4 and 4x of it, "
+             "so injected errors cannot throttle the run down to the scraper's 0.05 req/s floor."
+    )
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for each scraper run.")
+    parser.add_argument(
+        "scraper_args", nargs=argparse.REMAINDER,
+        help="Extra main.py options after --, e.g. -- --parser bs4 --listing-only"
+    )
+    args = parser.parse_args(argv)
+
+    server = start_server(args.latency_ms, args.jitter_ms, args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    extra = [arg for arg in args.scraper_args if arg != "--"]
+    context = multiprocessing.get_context("spawn")
+
+    print(f"stand-in at {base_url}: {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms latency, "
+          f"{args.error_rate:.0%} errors, {len(server.products)} product pages")
+    print(f"{'engine':>7} {'workers':>7} {'records':>7} {'pages':>6} {'errors':>6} {'pages/s':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'cpu s':>6} {'rss MB':>7}")
+    for engine in args.engines.split(","):
+        for workers in args.workers.split(","):
+            scraper_argv = [
+                "--engine", engine, "--workers", workers, "--max-in-flight", workers,
+                "--no-browser", "--no-cache", "--base-url", base_url, "--output", "output.csv",
+                "--rate", str(args.rate), "--min-rate", str(args.rate / 4), "--max-rate", str(args.rate * 4),
+            ] + (["--full-list"] if args.limit == 0 else ["--limit", str(args.limit)]) + extra
+            with server.lock:
+                server.requests = server.errors = 0
+            results = context.Queue()
+            process = context.Process(target=run_scraper, args=(scraper_argv, results))
+            process.start()
+            result = wait_for_result(process, results, args.timeout)
+            pages = server.requests
+            if result is None:
+                print(f"{engine:>7} {workers:>7} no result (exit code {process.exitcode})")
+                continue
+            print(
+                f"{engine:>7} {workers:>7} {result['records']:>7} {pages:>6} {server.errors:>6} "
+                f"{pages / result['elapsed']:>8.1f} {percentile(result['latencies'], 0.50) * 1000:>7.1f} "
+                f"{percentile(result['latencies'], 0.95) * 1000:>7.1f} {result['cpu']:>6.1f} {result['rss_mb']:>7.0f}"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
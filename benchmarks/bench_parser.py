@@ -0,0 +1,74 @@
+"""
+Compare parser backends on saved product pages.
+
+    python benchmarks/bench_parser.py                 # bundled fixture pages
+    python benchmarks/bench_parser.py saved/*.html    # your own saved pages
+
+Pages saved straight from a browser (Ctrl+S, "HTML only") are the most
+representative, since real product pages are several hundred KB.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import PARSER_BACKENDS, get_parser  # noqa: E402
+
+FIXTURE_GLOB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "products", "*.html")
+
+
+def bench_backend(parse, pages, repeat):
+    """Return the mean milliseconds per page for one backend."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page, "benchmark")
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / (repeat * len(pages))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="Saved product page HTML files (default: bundled fixtures).")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the page set per backend.")
+    args = parser.parse_args(argv)
+
+    paths = args.pages or sorted(glob.glob(FIXTURE_GLOB))
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    if not pages:
+        parser.error("no pages to benchmark")
+
+    backends = []
+    for name in sorted(PARSER_BACKENDS):
+        try:
+            backends.append((name, get_parser(name)))
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+
+    # Backends must agree before their speed means anything
+    reference = [PARSER_BACKENDS["bs4"](page, "benchmark") for page in pages]
+    for name, parse in backends:
+        for path, page, expected in zip(paths, pages, reference):
+            got = parse(page, "benchmark")
+            mismatched = [key for key in expected if got.get(key) != expected[key]]
+            if mismatched:
+                print(f"warning: {name} differs from bs4 on {path}: {', '.join(mismatched)}")
+
+    size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size_kb:.0f} KB average, {args.repeat} passes")
+    baseline = None
+    for name, parse in backends:
+        ms = bench_backend(parse, pages, args.repeat)
+        baseline = baseline or (ms if name == "bs4" else None)
+        speedup = f"{baseline / ms:5.1f}x" if baseline else ""
+        print(f"{name:>6}: {ms:8.3f} ms/page {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the memory held by product records as plain dicts and as ProductRecord.
+
+    python benchmarks/bench_records.py                  # 100,000 records
+    python benchmarks/bench_records.py --records 1000000
+
+Records are built from the parsed fixture pages, with every value a fresh
+string as it would be after parsing a real page, spread over a handful of
+categories and sellers. The dict records are what the parsers returned
+before ProductRecord; their category, seller and ship-from strings are not
+interned.
+"""
+import argparse
+import gc
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import PARSER_BACKENDS  # noqa: E402
+from record import ProductRecord  # noqa: E402
+
+FIXTURE_GLOB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "products", "*.html")
+CATEGORIES = [f"Best Sellers in Category {i}" for i in range(20)]
+SELLERS = [f"Seller {i} Retail" for i in range(50)]
+
+
+def fresh(value):
+    """A new string object equal to value, as parsing a new page would give."""
+    return value.encode("utf-8").decode("utf-8")
+
+
+def sample_rows(templates, count):
+    """Column-name dicts of fresh strings, cycling through the template records."""
+    for i in range(count):
+        row = {key: fresh(value) for key, value in templates[i % len(templates)].items()}
+        row["Category Name"] = fresh(CATEGORIES[i % len(CATEGORIES)])
+        row["Sold By"] = fresh(SELLERS[i % len(SELLERS)])
+        row["Ship From"] = fresh("Amazon")
+        row["ASIN"] = f"B{i:09d}"
+        row["Listing Rank"] = str(i % 100 + 1)
+        yield row
+
+
+def measure(build, templates, count):
+    """(bytes per record, seconds to build) for `count` records made by build(row)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = [build(row) for row in sample_rows(templates, count)]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / count, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000, help="Records to build per representation.")
+    args = parser.parse_args(argv)
+
+    templates = []
+    for path in sorted(glob.glob(FIXTURE_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            templates.append(PARSER_BACKENDS["bs4"](f.read(), "benchmark").to_dict())
+
+    print(f"{args.records} records from {len(templates)} fixture pages")
+    baseline = None
+    for name, build in (("dict", dict), ("ProductRecord", ProductRecord.from_dict)):
+        per_record, elapsed = measure(build, templates, args.records)
+        baseline = baseline or per_record
+        total_mb = per_record * args.records / 1024 / 1024
+        print(f"{name:>13}: {per_record:7.0f} B/record {total_mb:8.1f} MB "
+              f"{per_record / baseline:5.2f}x  built in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
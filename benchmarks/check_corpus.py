@@ -0,0 +1,136 @@
+"""
+Check every parser backend against the golden product page corpus, then time it.
+
+    python benchmarks/check_corpus.py                           # accuracy + ms/page for each backend
+    python benchmarks/check_corpus.py --max-ms lxml=2 --max-ms bs4=25
+    python benchmarks/check_corpus.py --update                  # rewrite expected records from bs4
+
+Each fixtures/products/<name>.html has its expected record in <name>.json.
+fixtures/prices.json maps displayed prices, including the ranged prices of
+variant products, to the value both normalize paths must give.
+The script exits non-zero when any backend gets a field wrong or is slower
+than its --max-ms budget, so a parser speedup cannot quietly break extraction.
+Review the diff after --update: the expected records are the specification.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_parser import FIXTURE_GLOB, bench_backend  # noqa: E402
+from normalize import normalize_batch, parse_price, pa  # noqa: E402
+from parsers import PARSER_BACKENDS, get_parser  # noqa: E402
+from record import ProductRecord  # noqa: E402
+
+CATEGORY = "golden"
+PRICES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "prices.json")
+
+
+def expected_path(page_path):
+    return os.path.splitext(page_path)[0] + ".json"
+
+
+def load_corpus(paths):
+    """(path, html, expected record or None) for every page."""
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            page = f.read()
+        expected = None
+        if os.path.exists(expected_path(path)):
+            with open(expected_path(path), encoding="utf-8") as f:
+                expected = json.load(f)
+        corpus.append((path, page, expected))
+    return corpus
+
+
+def check_backend(name, parse, corpus):
+    """Print every field a backend gets wrong and return how many there were."""
+    errors = 0
+    for path, page, expected in corpus:
+        got = parse(page, CATEGORY)
+        for field, value in expected.items():
+            if got.get(field) != value:
+                errors += 1
+                print(f"FAIL {name} {os.path.basename(path)} {field!r}: expected {value!r}, got {got.get(field)!r}")
+    return errors
+
+
+def check_prices(path=PRICES_PATH):
+    """Print every displayed price parse_price or normalize_batch gets wrong and return how many there were."""
+    with open(path, encoding="utf-8") as f:
+        expected = json.load(f)
+    results = {"parse_price": [parse_price(text) for text in expected]}
+    if pa is not None:
+        table = normalize_batch([ProductRecord(price=text) for text in expected])
+        results["normalize_batch"] = table.column("price").to_pylist()
+    errors = 0
+    for name, values in results.items():
+        for (text, value), got in zip(expected.items(), values):
+            # Compared as numbers, the batch path always has two decimal places
+            if (got is None) != (value is None) or (got is not None and got != Decimal(value)):
+                errors += 1
+                print(f"FAIL {name} {text!r}: expected {value!r}, got {got!r}")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="Product pages to check (default: the bundled corpus).")
+    parser.add_argument(
+        "--max-ms", action="append", default=[], metavar="BACKEND=MS",
+        help="Fail if BACKEND averages more than MS milliseconds per page (repeatable)."
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timing passes over the corpus per backend.")
+    parser.add_argument("--update", action="store_true", help="Write expected records from the bs4 backend.")
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    for budget in args.max_ms:
+        name, _, ms = budget.partition("=")
+        if name not in PARSER_BACKENDS or not ms:
+            parser.error(f"--max-ms expects BACKEND=MS with BACKEND one of {sorted(PARSER_BACKENDS)}")
+        budgets[name] = float(ms)
+
+    corpus = load_corpus(args.pages or sorted(glob.glob(FIXTURE_GLOB)))
+    if not corpus:
+        parser.error("no pages to check")
+
+    if args.update:
+        for path, page, _ in corpus:
+            with open(expected_path(path), "w", encoding="utf-8") as f:
+                json.dump(PARSER_BACKENDS["bs4"](page, CATEGORY).to_dict(), f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            print(f"wrote {expected_path(path)}")
+        return
+
+    missing = [path for path, _, expected in corpus if expected is None]
+    if missing:
+        parser.error(f"no expected record for {', '.join(missing)} (create one with --update and review it)")
+
+    price_errors = check_prices()
+    print(f"prices: {price_errors} wrong values {'ok' if not price_errors else 'FAIL'}")
+    failed = bool(price_errors)
+    print(f"{len(corpus)} pages, {args.repeat} timing passes")
+    for name in sorted(PARSER_BACKENDS):
+        try:
+            parse = get_parser(name)
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+            continue
+        errors = check_backend(name, parse, corpus)
+        ms = bench_backend(parse, [page for _, page, _ in corpus], args.repeat)
+        over_budget = name in budgets and ms > budgets[name]
+        status = "ok" if not errors and not over_budget else "FAIL"
+        budget = f" (budget {budgets[name]:.3f})" if name in budgets else ""
+        print(f"{name:>6}: {errors} wrong fields, {ms:8.3f} ms/page{budget} {status}")
+        failed = failed or status == "FAIL"
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
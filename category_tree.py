@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from urls import BASE_URL, canonical_url
+
+
+BESTSELLERS_ROOT = f"{BASE_URL}/gp/bestsellers/"
+
+# Category links in the bestseller navigation tree, current and older page layouts
+NAV_LINK_SELECTOR = "div[role='treeitem'] a[href], ul#zg_browseRoot a[href]"
+
+
+def has_category_nav(page_source):
+    """Whether a page carries the bestseller navigation (a bot check or error page does not)."""
+    return 'role="treeitem"' in page_source or 'id="zg_browseRoot"' in page_source
+
+
+def parse_category_links(page_source, base_url=BESTSELLERS_ROOT):
+    """(name, canonical URL) pairs for every bestseller category linked from a page's navigation."""
+    links = []
+    soup = BeautifulSoup(page_source, "html.parser")
+    for link_el in soup.select(NAV_LINK_SELECTOR):
+        name = link_el.get_text(" ", strip=True)
+        url = canonical_url(urljoin(base_url, link_el["href"]))
+        if name and ("/gp/bestsellers/" in url or "/zgbs/" in url):
+            links.append((name, url))
+    return links
+
+
+class CategoryTree:
+    """The bestseller category tree, persisted as JSON.
+
+    Every category records its parent and depth plus whether its own page has
+    been crawled, so an interrupted discovery picks up from its frontier.
+    """
+
+    def __init__(self, path="category_tree.json", root_url=BESTSELLERS_ROOT):
+        self.path = path
+        self.root_url = canonical_url(root_url)
+        self.max_depth = 0
+        self.complete = False
+        self.nodes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved tree, or return None if there isn't a readable one."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            if os.path.exists(path):
+                logging.warning(f"Ignoring unreadable category tree {path}: {e}")
+            return None
+        tree = cls(path, data["root"])
+        tree.max_depth = data["max_depth"]
+        tree.complete = data["complete"]
+        tree.nodes = {node["url"]: node for node in data["categories"]}
+        return tree
+
+    def save(self):
+        with self._lock:
+            data = {
+                "root": self.root_url,
+                "max_depth": self.max_depth,
+                "complete": self.complete,
+                "categories": list(self.nodes.values()),
+            }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def add(self, name, url, parent, depth):
+        """Add a category unless it is already known; returns True if it was new."""
+        with self._lock:
+            if url == self.root_url or url in self.nodes:
+                return False
+            self.nodes[url] = {"url": url, "name": name, "parent": parent, "depth": depth, "expanded": False}
+            return True
+
+    def path_name(self, url):
+        """Full category name from the top, e.g. "Electronics > Headphones"."""
+        names = []
+        while url in self.nodes:
+            names.append(self.nodes[url]["name"])
+            url = self.nodes[url]["parent"]
+        return " > ".join(reversed(names))
+
+    def frontier(self):
+        """Categories whose own pages still need crawling for subcategories."""
+        return [
+            node["url"] for node in self.nodes.values()
+            if not node["expanded"] and node["depth"] < self.max_depth
+        ]
+
+    def categories(self):
+        """Category name -> URL for every category in the tree, parents before children."""
+        nodes = sorted(self.nodes.values(), key=lambda node: node["depth"])
+        return {self.path_name(node["url"]): node["url"] for node in nodes}
+
+
+def discover_categories(fetch, tree, max_depth=2, workers=4):
+    """Breadth-first crawl of the bestseller navigation from the tree's root, down to `max_depth`.
+
+    `fetch(url)` returns a page's HTML or None. Each level is crawled with
+    `workers` threads and the tree is saved after every level. Pages that fail
+    to load stay in the frontier, and the tree is left incomplete so the next
+    run retries them.
+    """
+    if tree.max_depth < max_depth:
+        tree.complete = False
+    tree.max_depth = max(tree.max_depth, max_depth)
+
+    def expand(url):
+        page_source = fetch(url)
+        if page_source is None:
+            logging.warning(f"Could not load category page {url}, its subcategories are skipped")
+            return 0
+        depth = tree.nodes[url]["depth"] + 1 if url in tree.nodes else 1
+        added = sum(
+            tree.add(name, child_url, url if url in tree.nodes else None, depth)
+            for name, child_url in parse_category_links(page_source, url)
+        )
+        if url in tree.nodes:
+            tree.nodes[url]["expanded"] = True
+        return added
+
+    attempted = set()
+    frontier = tree.frontier() if tree.nodes else [tree.root_url]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while frontier:
+            attempted.update(frontier)
+            added = sum(executor.map(expand, frontier))
+            tree.save()
+            logging.info(f"Discovered {added} categories from {len(frontier)} pages ({len(tree.nodes)} total)")
+            frontier = [url for url in tree.frontier() if url not in attempted]
+    tree.complete = bool(tree.nodes) and not tree.frontier()
+    tree.save()
+    return tree
@@ -0,0 +1,207 @@
+"""
+Coordinator and worker loops for a crawl split across processes or machines.
+
+The coordinator queues one task per category and writes the records workers
+send back. A worker leases a category task, scrapes its bestseller listing
+and queues a product task per product; product tasks fetch and parse the
+product page. Records travel back through the queue's results, and the
+coordinator joins each product's details onto every category that listed it.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from listing import merge_detail_record
+from record import ProductRecord
+from urls import product_asin
+
+
+CATEGORY_TASK = "category"
+PRODUCT_TASK = "product"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def enqueue_categories(queue, categories, limit=10, pages=1, detail_fields=None):
+    """Queue a task per category; the crawl settings travel with it so workers need no flags."""
+    added = 0
+    for name, url in categories.items():
+        payload = {"name": name, "url": url, "limit": limit, "pages": pages, "detail_fields": detail_fields}
+        added += queue.put(f"{CATEGORY_TASK}:{url}", CATEGORY_TASK, payload)
+    return added
+
+
+def run_coordinator(queue, sink, categories, limit=10, pages=1, detail_fields=None, poll_interval=2.0,
+                    report_interval=30.0):
+    """Queue the categories, then write records as workers finish them until the queue drains.
+
+    Results are read from the start of the queue, so a coordinator restarted
+    on the same queue rewrites the whole output without redoing any work.
+    """
+    queue.set_finished(False)
+    added = enqueue_categories(queue, categories, limit, pages, detail_fields)
+    logging.info(f"Queued {added} of {len(categories)} categories, waiting for workers")
+
+    listings = {}  # Product URL -> listing records still waiting for its product page
+    details = {}  # Product URL -> parsed product page, for categories that list it later
+
+    def write(product_url, listing_record, detail_record):
+        record = merge_detail_record(listing_record, detail_record, detail_fields)
+        record["ASIN"] = product_asin(product_url)
+        sink.write(record)
+
+    cursor = 0
+    last_report = time.monotonic()
+    while True:
+        # Counted before reading, so results pushed by the last task are still read below
+        counts = queue.counts()
+        batch = queue.results(cursor)
+        for cursor, result in batch:
+            product_url = result["url"]
+            record = ProductRecord.from_dict(result["record"])
+            if result["type"] == "listing":
+                if detail_fields == []:
+                    sink.write(record)
+                elif product_url in details:
+                    write(product_url, record, details[product_url])
+                else:
+                    listings.setdefault(product_url, []).append(record)
+            else:
+                details[product_url] = record
+                for listing_record in listings.pop(product_url, []):
+                    write(product_url, listing_record, record)
+        if batch:
+            continue
+        if not counts["queued"] and not counts["leased"]:
+            break
+        requeued = queue.requeue_expired()
+        if requeued:
+            logging.warning(f"Requeued {requeued} tasks whose workers stopped sending heartbeats")
+        if time.monotonic() - last_report >= report_interval:
+            last_report = time.monotonic()
+            logging.info(
+                f"Queue: {counts['queued']} queued, {counts['leased']} leased, "
+                f"{counts['done']} done, {counts['failed']} failed"
+            )
+        time.sleep(poll_interval)
+
+    # Product pages that failed every attempt keep their listing values
+    for listing_records in listings.values():
+        for listing_record in listing_records:
+            sink.write(listing_record)
+    queue.set_finished()
+    counts = queue.counts()
+    logging.info(f"Queue drained: {counts['done']} tasks done, {counts['failed']} failed")
+    return counts
+
+
+class LeaseKeeper:
+    """Background thread renewing the leases a worker holds, every `interval` seconds."""
+
+    def __init__(self, queue, worker_id, lease_seconds=120, interval=30.0):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+        self._thread.start()
+
+    def hold(self, task_id):
+        with self._lock:
+            self._held.add(task_id)
+
+    def release(self, task_id):
+        with self._lock:
+            self._held.discard(task_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                held = list(self._held)
+            for task_id in held:
+                try:
+                    if not self.queue.heartbeat(task_id, self.worker_id, self.lease_seconds):
+                        logging.warning(f"Lost the lease on {task_id}, another worker will redo it")
+                        self.release(task_id)
+                except Exception as e:
+                    logging.error(f"Heartbeat for {task_id} failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_task(task, scrape_listing, scrape_product):
+    """(results, follow-up tasks) for one leased task."""
+    payload = task["payload"]
+    if task["kind"] == CATEGORY_TASK:
+        listing = list(scrape_listing(
+            payload["name"], payload["url"], payload["limit"], payload["pages"], payload["detail_fields"]
+        ))
+        if not listing:
+            # Usually a bot check or error page, so let another attempt have it
+            raise RuntimeError(f"no products found for category {payload['name']}")
+        results = [{"type": "listing", "url": url, "record": record.to_dict()} for url, record in listing]
+        tasks = []
+        if payload["detail_fields"] != []:
+            tasks = [
+                (f"{PRODUCT_TASK}:{url}", PRODUCT_TASK, {"url": url, "category": payload["name"]})
+                for url, _ in listing
+            ]
+        return results, tasks
+    record = scrape_product(payload["url"], payload["category"])
+    return [{"type": "detail", "url": payload["url"], "record": record.to_dict()}], []
+
+
+def run_worker(queue, scrape_listing, scrape_product, worker_id=None, threads=1, lease_seconds=120,
+               heartbeat_interval=30.0, poll_interval=2.0):
+    """Lease and run tasks on `threads` threads until the coordinator marks the queue finished.
+
+    `scrape_listing(name, url, limit, pages, detail_fields)` yields (product
+    URL, listing record) pairs and `scrape_product(url, category_name)`
+    returns a parsed record. A task that raises is handed back to the queue
+    for a retry.
+    """
+    worker_id = worker_id or default_worker_id()
+    keeper = LeaseKeeper(queue, worker_id, lease_seconds, heartbeat_interval)
+    done = [0]
+    lock = threading.Lock()
+
+    def work():
+        while not queue.finished():
+            task = queue.lease(worker_id, lease_seconds)
+            if task is None:
+                time.sleep(poll_interval)
+                continue
+            keeper.hold(task["id"])
+            try:
+                results, tasks = run_task(task, scrape_listing, scrape_product)
+            except Exception as e:
+                logging.error(f"Task {task['id']} failed (attempt {task['attempts']}): {e}", exc_info=True)
+                queue.fail(task["id"], worker_id, repr(e))
+                continue
+            finally:
+                keeper.release(task["id"])
+            if queue.complete(task["id"], worker_id, results, tasks):
+                with lock:
+                    done[0] += 1
+            else:
+                logging.warning(f"Lease on {task['id']} expired before it finished, its results were dropped")
+
+    logging.info(f"Worker {worker_id} started with {threads} threads")
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for future in [executor.submit(work) for _ in range(threads)]:
+                future.result()
+    finally:
+        keeper.close()
+    logging.info(f"Worker {worker_id} finished {done[0]} tasks")
+    return done[0]
@@ -0,0 +1,62 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class WebDriverPool:
+    """A fixed-size pool of WebDriver instances shared by worker threads.
+
+    Drivers are started lazily, so a pool that is never used (or only lightly
+    used) does not pay for launching every browser up front.
+    """
+
+    def __init__(self, driver_factory, size=4):
+        self.driver_factory = driver_factory
+        self.size = max(1, int(size))
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._drivers) < self.size:
+                driver = self.driver_factory()
+                self._drivers.append(driver)
+                return driver
+        # Every driver is busy, wait for one to be handed back
+        return self._idle.get()
+
+    @contextmanager
+    def driver(self):
+        """Borrow a driver for the duration of the block."""
+        driver = self._acquire()
+        try:
+            yield driver
+        finally:
+            self._idle.put(driver)
+
+    def run(self, func, *args):
+        """Call func(driver, *args) with a borrowed driver and return its result."""
+        with self.driver() as driver:
+            return func(driver, *args)
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.warning(f"Error closing pooled driver: {e}")
+        self._idle = queue.Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
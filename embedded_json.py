@@ -0,0 +1,154 @@
+"""
+Product fields from the JSON that product pages embed for their own scripts.
+
+Rather than parsing the page, each payload is found with a plain substring
+search for its marker and decoded in place with JSONDecoder.raw_decode, so
+only the JSON itself is read. Sources, most specific first:
+
+    twister price data   <div class="twister-plus-buying-options-price-data">{...}</div>
+    colorImages          'colorImages': { 'initial': [{"hiRes": ..., "large": ...}, ...] }
+    data-a-state         <script type="a-state" data-a-state="{&quot;key&quot;:...}">{...}</script>
+    JSON-LD              <script type="application/ld+json">{"@type": "Product", ...}</script>
+"""
+import html
+import json
+import re
+
+
+_DECODER = json.JSONDecoder()
+_SPACE = re.compile(r"\s*")
+_TWISTER_PRICE_MARKER = "twister-plus-buying-options-price-data"
+_COLOR_IMAGES_PATTERN = re.compile(r"""['"]colorImages['"]\s*:\s*\{\s*['"]initial['"]\s*:\s*""")
+_A_STATE_MARKER = 'data-a-state="'
+_JSON_LD_MARKER = "application/ld+json"
+
+
+def _decode_at(page_source, idx):
+    """Decode the JSON value starting at idx, after any whitespace, or None."""
+    try:
+        return _DECODER.raw_decode(page_source, _SPACE.match(page_source, idx).end())[0]
+    except ValueError:
+        return None
+
+
+def _tag_body(page_source, idx):
+    """Index just past the '>' closing the tag that contains idx."""
+    end = page_source.find(">", idx)
+    return -1 if end == -1 else end + 1
+
+
+def twister_prices(page_source):
+    """Buying-option price entries, e.g. [{"displayPrice": "₹299.00", "priceAmount": 299.0, ...}]."""
+    idx = page_source.find(_TWISTER_PRICE_MARKER)
+    body = _tag_body(page_source, idx) if idx != -1 else -1
+    data = _decode_at(page_source, body) if body != -1 else None
+    if isinstance(data, dict):
+        # Grouped by buybox, e.g. {"desktop_buybox_group_1": [...]}
+        return [entry for group in data.values() if isinstance(group, list) for entry in group]
+    return data if isinstance(data, list) else []
+
+
+def color_images(page_source):
+    """The image gallery: one dict per image with "hiRes", "large" and "thumb" URLs."""
+    match = _COLOR_IMAGES_PATTERN.search(page_source)
+    data = _decode_at(page_source, match.end()) if match else None
+    return [image for image in data if isinstance(image, dict)] if isinstance(data, list) else []
+
+
+def a_states(page_source):
+    """Every data-a-state payload on the page, by its key."""
+    states = {}
+    idx = page_source.find(_A_STATE_MARKER)
+    while idx != -1:
+        attr_start = idx + len(_A_STATE_MARKER)
+        attr_end = page_source.find('"', attr_start)
+        try:
+            key = json.loads(html.unescape(page_source[attr_start:attr_end])).get("key")
+        except (ValueError, AttributeError):
+            key = None
+        body = _tag_body(page_source, attr_end)
+        if key and body != -1:
+            data = _decode_at(page_source, body)
+            if data is not None:
+                states.setdefault(key, data)
+        idx = page_source.find(_A_STATE_MARKER, attr_end)
+    return states
+
+
+def json_ld_product(page_source):
+    """The schema.org Product object from the page's JSON-LD blocks, or None."""
+    idx = page_source.find(_JSON_LD_MARKER)
+    while idx != -1:
+        body = _tag_body(page_source, idx)
+        data = _decode_at(page_source, body) if body != -1 else None
+        if isinstance(data, dict):
+            data = data.get("@graph", [data])
+        for item in data if isinstance(data, list) else []:
+            if isinstance(item, dict) and "Product" in _as_list(item.get("@type")):
+                return item
+        idx = page_source.find(_JSON_LD_MARKER, idx + len(_JSON_LD_MARKER))
+    return None
+
+
+def _format_inr(amount):
+    """1299.0 -> '₹1,299.00', with the lakh grouping amazon.in displays (₹1,29,999.00)."""
+    whole, fraction = f"{float(amount):.2f}".split(".")
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return "₹" + ",".join(groups + [tail]) + "." + fraction
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else value
+
+
+def extract_embedded_fields(page_source):
+    """Record fields found in the page's embedded JSON; fields it lacks are left out."""
+    fields = {}
+    product = json_ld_product(page_source) or {}
+
+    name = product.get("name")
+    if isinstance(name, str) and name.strip():
+        fields["Product Name"] = html.unescape(name).strip()
+
+    prices = [entry for entry in twister_prices(page_source) if isinstance(entry, dict)]
+    offer = _first(product.get("offers")) or {}
+    if prices and prices[0].get("displayPrice"):
+        fields["Product Price"] = prices[0]["displayPrice"]
+    elif isinstance(offer, dict) and offer.get("price") not in (None, "") and offer.get("priceCurrency") == "INR":
+        try:
+            fields["Product Price"] = _format_inr(offer["price"])
+        except ValueError:
+            pass
+
+    rating = product.get("aggregateRating") or {}
+    if isinstance(rating, dict) and rating.get("ratingValue") not in (None, ""):
+        try:
+            fields["Rating"] = f"{float(rating['ratingValue']):g} out of 5"
+        except ValueError:
+            pass
+
+    seller = offer.get("seller") if isinstance(offer, dict) else None
+    if isinstance(seller, dict) and seller.get("name"):
+        fields["Sold By"] = html.unescape(seller["name"]).strip()
+
+    # Full-size gallery first, then the landing image, then whatever JSON-LD lists
+    image_urls = [image.get("hiRes") or image.get("large") for image in color_images(page_source)]
+    if not any(image_urls):
+        landing = a_states(page_source).get("desktop-landing-image-data") or {}
+        image_urls = [landing.get("landingImageUrl")] if isinstance(landing, dict) else []
+    if not any(image_urls):
+        image_urls = _as_list(product.get("image"))
+    image_urls = [url for url in image_urls if isinstance(url, str) and url.startswith("http")]
+    if image_urls:
+        fields["All Available Images"] = "\n".join(dict.fromkeys(image_urls))
+    return fields
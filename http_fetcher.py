@@ -0,0 +1,67 @@
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+
+
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+    "Connection": "keep-alive",
+}
+
+IMAGE_HEADERS = {"Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"}
+
+
+class HttpFetcher:
+    """Plain HTTP page fetcher backed by a pooled keep-alive requests.Session."""
+
+    def __init__(self, user_agent, pool_size=10, timeout=15):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get(self, url, timing, headers=None):
+        """(response, status): the response is None unless the status is 200, the status is None if none came back."""
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+        except requests.RequestException as e:
+            logging.warning(f"HTTP fetch failed for {url}: {e}")
+            timing.outcome = "error"
+            return None, None
+        if response.status_code != 200:
+            logging.warning(f"HTTP fetch for {url} returned status {response.status_code}")
+            timing.outcome = f"status_{response.status_code}"
+            return None, response.status_code
+        return response, response.status_code
+
+    def fetch_with_status(self, url):
+        """(page HTML or None, HTTP status or None when the request got no response)."""
+        with METRICS.time("http_fetch") as timing:
+            response, status = self._get(url, timing)
+            return (response.text if response is not None else None), status
+
+    def fetch(self, url):
+        """Return the page HTML, or None if the request failed."""
+        return self.fetch_with_status(url)[0]
+
+    def fetch_bytes(self, url):
+        """Return an image's bytes, or None if the request failed."""
+        with METRICS.time("image_fetch") as timing:
+            response, _ = self._get(url, timing, IMAGE_HEADERS)
+            return response.content if response is not None else None
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
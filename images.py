@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from metrics import METRICS
+
+
+# Size and format modifiers between the image id and the extension, e.g. "._SX300_SY300_QL70_FMwebp_"
+IMAGE_MODIFIER_PATTERN = re.compile(r"\._[^/.]+_(\.\w+)$")
+
+
+def full_resolution_url(url):
+    """The original upload behind a resized image URL.
+
+    'https://m.media-amazon.com/images/I/41Jm7lVfC5L._SX300_SY300_QL70_FMwebp_.jpg'
+    -> 'https://m.media-amazon.com/images/I/41Jm7lVfC5L.jpg'
+    """
+    return IMAGE_MODIFIER_PATTERN.sub(r"\1", url)
+
+
+class ImageStore:
+    """Image files named by the SHA-256 of their content, in sharded directories.
+
+    A file lands at root/ab/cd/abcd....jpg, so no directory grows too large
+    and identical images from different URLs are stored once. index.jsonl
+    maps each source URL to its file, so a URL is downloaded once across runs.
+    """
+
+    def __init__(self, root="images", shard_depth=2):
+        self.root = root
+        self.shard_depth = shard_depth
+        self.stored = 0
+        self.duplicates = 0
+        self._paths = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        index_path = os.path.join(root, "index.jsonl")
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a half-written last line
+                        continue
+                    self._paths[entry["url"]] = entry["path"]
+        self._index = open(index_path, "a", encoding="utf-8")
+
+    def path_for(self, url):
+        """Local path of an image already downloaded from url, or None."""
+        with self._lock:
+            path = self._paths.get(url)
+        return os.path.join(self.root, path) if path else None
+
+    def save(self, url, data):
+        """Store an image's bytes and return its local path."""
+        digest = hashlib.sha256(data).hexdigest()
+        extension = os.path.splitext(urlparse(url).path)[1].lower() or ".jpg"
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        path = os.path.join(*shards, digest + extension)
+        full_path = os.path.join(self.root, path)
+        with self._lock:
+            if os.path.exists(full_path):
+                self.duplicates += 1
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                # Write to a temp file and rename so readers never see a partial image
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, full_path)
+                self.stored += 1
+            self._paths[url] = path
+            self._index.write(json.dumps({"url": url, "path": path}) + "\n")
+            self._index.flush()
+        return full_path
+
+    def close(self):
+        with self._lock:
+            self._index.close()
+
+
+class ImageStage:
+    """Sink stage that downloads a record's images before passing the record on.
+
+    Images are fetched at full resolution by `max_in_flight` threads sharing
+    one pooled HTTP client, falling back to the URL on the page if the
+    original is unavailable. Each URL is fetched once per run (and once ever,
+    through the store's index). The record is written to `sink` with the
+    local paths in "Local Images" once all of its images are done. Closing
+    the stage closes the fetcher and the store, then `sink`.
+    """
+
+    def __init__(self, sink, store, fetcher, max_in_flight=8):
+        self.sink = sink
+        self.store = store
+        self.fetcher = fetcher
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="image")
+        self._downloads = {}
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self.sink.count
+
+    def write(self, record):
+        images = record.get("All Available Images", "N/A")
+        page_urls = images.split("\n") if images and images != "N/A" else []
+        # Thumbnail and large versions of the same image share one original
+        downloads = {}
+        for page_url in page_urls:
+            url = full_resolution_url(page_url)
+            if url not in downloads:
+                downloads[url] = self._download(url, page_url)
+        if not downloads:
+            record["Local Images"] = "N/A"
+            self.sink.write(record)
+            return
+
+        futures = list(downloads.values())
+        remaining = [len(futures)]
+
+        def done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            # Different URLs can hold the same image, and so the same file
+            paths = list(dict.fromkeys(future.result() for future in futures if future.result()))
+            record["Local Images"] = "\n".join(paths) if paths else "N/A"
+            self.sink.write(record)
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _download(self, url, fallback_url):
+        """A Future for the local path of url's image, starting the download unless it already ran."""
+        with self._lock:
+            future = self._downloads.get(url)
+            if future is None:
+                path = self.store.path_for(url)
+                if path:
+                    future = Future()
+                    future.set_result(path)
+                    METRICS.increment("image", "cached")
+                else:
+                    future = self._executor.submit(self._fetch, url, fallback_url)
+                self._downloads[url] = future
+            return future
+
+    def _fetch(self, url, fallback_url):
+        try:
+            data = self.fetcher.fetch_bytes(url)
+            if data is None and fallback_url != url:
+                data = self.fetcher.fetch_bytes(fallback_url)
+            if data is None:
+                METRICS.increment("image", "error")
+                return None
+            METRICS.increment("image", "downloaded")
+            return self.store.save(url, data)
+        except Exception as e:
+            logging.error(f"Could not download image {url}: {e}", exc_info=True)
+            METRICS.increment("image", "error")
+            return None
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        # Downloads finish first, and write the last records as they do
+        self._executor.shutdown(wait=True)
+        self.fetcher.close()
+        self.store.close()
+        self.sink.close()
+        logging.info(
+            f"Images: {self.store.stored} stored, {self.store.duplicates} duplicate files skipped, "
+            f"{len(self._downloads)} URLs in {self.store.root}"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
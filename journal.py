@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from record import ProductRecord
+
+
+class ProgressJournal:
+    """Append-only JSONL log of finished category listings and product records.
+
+    Each line is written and flushed as soon as the work completes, so after a
+    crash a run started with resume=True can skip everything already done.
+    Only the file offset of each product's line is kept in memory, and the
+    record is read back from disk when it is reused, so memory stays flat
+    however large the crawl.
+    """
+
+    def __init__(self, path="scrape_journal.jsonl", resume=False):
+        self.path = path
+        self._categories = {}
+        self._products = {}  # Product URL -> byte offset of its line
+        self._lock = threading.Lock()
+        self._reader = None
+        torn = False
+        if resume and os.path.exists(path):
+            torn = self._load()
+        self._file = open(path, "ab" if resume else "wb")
+        if torn:
+            # End the half-written line so the next entry starts a line of its own
+            self._file.write(b"\n")
+
+    def _load(self):
+        """Read the journal, returning whether its last line was left unfinished."""
+        offset = 0
+        line = b""
+        with open(self.path, "rb") as f:
+            for line in f:
+                start, offset = offset, offset + len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a half-written last line
+                    continue
+                if entry.get("type") == "category":
+                    self._categories[entry["url"]] = entry["product_urls"]
+                elif entry.get("type") == "product":
+                    self._products[entry["url"]] = start
+        logging.info(
+            f"Resuming from {self.path}: {len(self._categories)} categories and "
+            f"{len(self._products)} products already done"
+        )
+        return bool(line) and not line.endswith(b"\n")
+
+    def _append(self, entry):
+        """Write one entry and return the byte offset of its line."""
+        entry["time"] = time.time()
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+        return offset
+
+    def category_urls(self, category_url):
+        """Product URLs journaled for a category page, or None if it still needs scraping."""
+        return self._categories.get(category_url)
+
+    def add_category(self, category_name, category_url, product_urls):
+        if not product_urls:
+            return
+        self._categories[category_url] = product_urls
+        self._append({"type": "category", "url": category_url, "category": category_name,
+                      "product_urls": product_urls})
+
+    def product_record(self, product_url, category_name):
+        """Journaled record for a product, or None if it still needs scraping.
+
+        A product scraped for one category is reused for any other category
+        listing the same URL.
+        """
+        offset = self._products.get(product_url)
+        if offset is None:
+            return None
+        with self._lock:
+            if self._reader is None:
+                self._reader = open(self.path, "rb")
+            self._reader.seek(offset)
+            line = self._reader.readline()
+        record = ProductRecord.from_dict(json.loads(line)["record"])
+        record["Category Name"] = category_name
+        return record
+
+    def add_product(self, product_url, category_name, record):
+        # Failed products are left out so a resumed run tries them again
+        if record.get("Product Name", "N/A") == "N/A":
+            return
+        entry = {"type": "product", "url": product_url, "category": category_name, "record": record.to_dict()}
+        self._products[product_url] = self._append(entry)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            if self._reader:
+                self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,93 @@
+import json
+
+from parsers import empty_product_record
+from urls import canonical_product_url, product_asin
+
+
+FACEOUT_SELECTOR = "div.zg-grid-general-faceout"
+
+# Fields a bestseller grid faceout carries; everything else needs the product page
+LISTING_FIELDS = ("Product Name", "Product Price", "Rating", "Listing Rank")
+
+
+def _text(item, selector):
+    el = item.select_one(selector)
+    text = el.get_text(" ", strip=True) if el else ""
+    return text or "N/A"
+
+
+def parse_faceout(item, category_name, rank):
+    """Product URL and listing record for one grid item, or (None, None) if it has no product link.
+
+    `item` is the faceout or the grid cell around it; the cell also holds the
+    "#N" rank badge, otherwise `rank` (its position in the list) is used.
+    """
+    link_el = item.select_one("a.a-link-normal[href]")
+    if not link_el:
+        return None, None
+    product_url = canonical_product_url(link_el["href"])
+
+    record = empty_product_record(category_name)
+    record["ASIN"] = product_asin(product_url)
+    record["Product Name"] = _text(item, "div[class*='line-clamp'], div.p13n-sc-truncate")
+    if record["Product Name"] == "N/A":
+        img_el = item.select_one("img[alt]")
+        record["Product Name"] = img_el["alt"].strip() if img_el and img_el["alt"].strip() else "N/A"
+    record["Product Price"] = _text(item, "span[class*='p13n-sc-price'], span.a-color-price")
+    record["Rating"] = _text(item, "i[class*='a-icon-star'] span.a-icon-alt, span.a-icon-alt")
+    badge = _text(item, "span.zg-bdg-text").lstrip("#")
+    record["Listing Rank"] = badge if badge.isdigit() else str(rank)
+    return product_url, record
+
+
+def listing_stub(product_url, category_name, rank):
+    """Listing record for a product known only by its URL and position, e.g. from a journal."""
+    record = empty_product_record(category_name)
+    record["ASIN"] = product_asin(product_url)
+    record["Listing Rank"] = str(rank)
+    return record
+
+
+def has_stubs(listing):
+    """Whether a parsed listing has lazy-loaded rows known only by URL and rank (see listing_stub)."""
+    return any(
+        record["Product Name"] == "N/A" and record["Product Price"] == "N/A" and record["Rating"] == "N/A"
+        for _, record in listing
+    )
+
+
+def parse_category_listing(soup, category_name, limit=10, start_rank=1):
+    """(product URL, listing record) pairs, in rank order, from a parsed bestseller page."""
+    listing = []
+    for faceout in soup.select(FACEOUT_SELECTOR):
+        item = faceout.find_parent(id="gridItemRoot") or faceout
+        product_url, record = parse_faceout(item, category_name, start_rank + len(listing))
+        if product_url:
+            listing.append((product_url, record))
+    # Rows below the fold are lazy-loaded, but every ASIN on the page is listed on the grid
+    grid = soup.select_one("[data-client-recs-list]")
+    if grid:
+        try:
+            recs = json.loads(grid["data-client-recs-list"])
+        except ValueError:
+            recs = []
+        for rec in recs[len(listing):]:
+            if rec.get("id"):
+                product_url = canonical_product_url(f"/dp/{rec['id']}")
+                listing.append((product_url, listing_stub(product_url, category_name, start_rank + len(listing))))
+    return listing[:limit] if limit else listing
+
+
+def merge_detail_record(listing_record, detail_record, fields=None):
+    """The listing record with values from the product page laid over it.
+
+    Only `fields` are taken from the product page when given, and a field the
+    page is missing keeps its listing value.
+    """
+    record = listing_record.copy()
+    for field, value in detail_record.items():
+        if field == "Category Name" or value == "N/A":
+            continue
+        if fields is None or field in fields:
+            record[field] = value
+    return record
@@ -1,16 +1,43 @@
 import time
-import csv
 import logging
 import random
 import os
+import argparse
+import asyncio
+import contextlib
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 
+from async_crawler import AsyncFetcher, HostRateLimiter
+from category_tree import BESTSELLERS_ROOT, NAV_LINK_SELECTOR, CategoryTree, discover_categories, has_category_nav
+from distributed import run_coordinator, run_worker
+from driver_pool import WebDriverPool
+from http_fetcher import HttpFetcher
+from images import ImageStage, ImageStore
+from journal import ProgressJournal
+from metrics import METRICS
+from listing import (
+    FACEOUT_SELECTOR, has_stubs, listing_stub, merge_detail_record, parse_category_listing, parse_faceout
+)
+from page_cache import PageCache
+from parse_stage import ParseStage
+from parsers import set_default_backend, PARSER_BACKENDS, DEFAULT_BACKEND
+from session_store import apply_session_to_http, is_logged_in, load_session, restore_session, save_session
+from throttle import AdaptiveThrottle
+from tracing import TRACER, export_chrome_trace
+from sinks import COLUMNAR_FORMATS, FIELDNAMES, SINKS, MetricsSink, TeeSink, open_sink
+from snapshot_store import SnapshotStore
+from urls import canonical_product_url, category_page_url, product_asin, rebase_url, set_base_url
+from work_queue import open_queue
+
 
 # Initialize logging
 logging.basicConfig(
@@ -32,9 +59,24 @@ category_urls = {
     "electronics": "https://www.amazon.in/gp/bestsellers/electronics/ref=zg_bs_nav_electronics_0"
 }
 
+# Bestseller lists are the top 100, 50 products per page
+BESTSELLER_PAGES = 2
+BESTSELLER_PAGE_SIZE = 50
+
+# Tries per page over plain HTTP before it counts as failed
+HTTP_ATTEMPTS = 4
+
+# One round trip returns every grid cell currently in the DOM, in rank order
+GRID_ITEMS_SCRIPT = """
+return Array.from(document.querySelectorAll('div.zg-grid-general-faceout')).map(function (el) {
+    return (el.closest('#gridItemRoot') || el).outerHTML;
+});
+"""
+GRID_COUNT_SCRIPT = "return document.querySelectorAll('div.zg-grid-general-faceout').length;"
 
-def get_webdriver():
-    user_agent = random.choice(USER_AGENTS)
+
+def get_webdriver(user_agent=None):
+    user_agent = user_agent or random.choice(USER_AGENTS)
     chrome_options = Options()
     chrome_options.add_argument("--incognito")
     chrome_options.add_argument(f"user-agent={user_agent}")
@@ -97,224 +139,989 @@ def login_amazon(driver, email, password):
         return
 
     # If OTP is required, give time to the user to complete it
-    # Wait for 2 minutes to allow user to enter OTP and complete sign-in
-    logging.info("Waiting 2 minutes for OTP entry. Please complete OTP verification in the opened browser.")
-    time.sleep(120)  # Wait 2 mins for manual OTP entry
-
-
-def parse_product_details(soup, category_name, driver):
-    # Product Name
-    title_el = soup.select_one("#productTitle")
-    product_name = title_el.get_text(strip=True) if title_el else "N/A"
-
-    # Price
-    price_el = soup.select_one("#corePrice_feature_div .a-offscreen, #apex_desktop .a-offscreen")
-    product_price = price_el.get_text(strip=True) if price_el else "N/A"
-
-    # Rating (detailed rating)
-    rating_el = soup.select_one("span[data-hook='rating-out-of-text']")
-    rating = rating_el.get_text(strip=True) if rating_el else "N/A"
-
-    # Best Seller Rating
-    best_seller_rating = "N/A"
-    detail_wrapper = soup.select_one("#detailBulletsWrapper_feature_div")
-    if detail_wrapper:
-        detail_text = detail_wrapper.get_text(" ", strip=True)
-        if "Best Sellers Rank" in detail_text:
-            for line in detail_text.split("\n"):
-                if "Best Sellers Rank" in line:
-                    best_seller_rating = line.strip()
-                    break
-
-    # Ship From and Sold By
-    ship_from = "N/A"
-    sold_by = "N/A"
-
-    # Try tabular buybox first
-    tabular_box = soup.select_one("#tabular-buybox")
-    if tabular_box:
-        tb_text = tabular_box.get_text(" ", strip=True)
-        if "Ships from" in tb_text:
-            idx = tb_text.find("Ships from")
-            line = tb_text[idx:].split(" ")[2:]  # after 'Ships from'
-            ship_from_candidate = " ".join(line).strip()
-            if ship_from_candidate:
-                ship_from = ship_from_candidate.split("Sold")[0].strip()
-
-        if "Sold by" in tb_text:
-            idx = tb_text.find("Sold by")
-            line = tb_text[idx:].split(" ")[2:]  # after 'Sold by'
-            sold_by_candidate = " ".join(line).strip()
-            sold_by_candidate = sold_by_candidate.replace("Fulfilled by Amazon", "").strip()
-            if sold_by_candidate:
-                sold_by = sold_by_candidate
-    else:
-        merchant_info = soup.select_one("#merchant-info")
-        if merchant_info:
-            m_text = merchant_info.get_text(" ", strip=True)
-            if "Sold by" in m_text:
-                parts = m_text.split("Sold by")
-                if len(parts) > 1:
-                    sold_part = parts[1].strip()
-                    sold_part = sold_part.replace("Fulfilled by Amazon", "").strip()
-                    if sold_part:
-                        sold_by = sold_part
-            if "Ships from" in m_text:
-                if "Amazon" in m_text:
-                    ship_from = "Amazon"
-
-    # Product Description
-    product_description = "N/A"
-    feature_bullets = soup.select_one("#feature-bullets")
-    if feature_bullets:
-        bullets = feature_bullets.select("li")
-        bullet_points = [b.get_text(strip=True) for b in bullets if b.get_text(strip=True)]
-        if bullet_points:
-            product_description = "\n".join(bullet_points)
-    else:
-        desc_fallback = soup.select_one("#productDescription")
-        if desc_fallback:
-            desc_text = desc_fallback.get_text(" ", strip=True)
-            if desc_text:
-                product_description = desc_text
-
-    # Number Bought in the Past Month (Not always present)
-    number_bought = "N/A"
-    page_source = driver.page_source
-    if "bought in past month" in page_source:
-        for line in page_source.split("\n"):
-            if "bought in past month" in line:
-                number_bought_val = line.strip()
-                number_bought = number_bought_val if number_bought_val else "N/A"
-                break
-
-    image_elements = soup.select("#imageBlockContainer img")
-    image_urls = []
-    for img in image_elements:
-        src = img.get("src")
-        if src and "data:image" not in src:
-            image_urls.append(src)
-
-    images_multiline = "\n".join(list(set(image_urls))) if image_urls else "N/A"
-
-    return {
-        "Category Name": category_name,
-        "Product Name": product_name,
-        "Product Price": product_price,
-        "Best Seller Rating": best_seller_rating,
-        "Ship From": ship_from,
-        "Sold By": sold_by,
-        "Rating": rating,
-        "Product Description": product_description,
-        "Number Bought in the Past Month": number_bought,
-        "All Available Images": images_multiline
-    }
-
-
-def get_product_details(driver, product_url, category_name, retries=2):
-    """Scrape detailed information from product detail page with retry logic."""
+    # Wait up to 2 minutes for the user to enter OTP, moving on as soon as sign-in completes
+    logging.info("Waiting up to 2 minutes for OTP entry. Please complete OTP verification in the opened browser.")
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if is_logged_in(driver):
+            return True
+        time.sleep(2)
+    return is_logged_in(driver)
+
+
+def get_product_page(driver, product_url, retries=2, throttle=None):
+    """Load a product page in the browser with retry logic, returning its HTML or None."""
     for attempt in range(retries):
+        with TRACER.span("attempt", attempt=attempt + 1) as attempt_span:
+            try:
+                with METRICS.time("driver_get"):
+                    driver.get(product_url)
+                with METRICS.time("wait_for_element") as timing:
+                    element = wait_for_element(driver, By.ID, "productTitle", timeout=10)
+                    if not element:
+                        timing.outcome = "timeout"
+                if not element:
+                    logging.warning(f"Product title not found at {product_url}, attempt {attempt+1}")
+                    METRICS.increment("product_page_attempt", "timeout")
+                    if attempt_span:
+                        attempt_span.outcome = "timeout"
+                    if throttle:
+                        throttle.failure("missing product title")
+                    with METRICS.time("backoff_sleep"):
+                        time.sleep(throttle.backoff(attempt) if throttle else 2)
+                    continue  # Retry
+
+                if throttle:
+                    throttle.success()
+                with METRICS.time("page_source"):
+                    page_source = driver.page_source
+                METRICS.increment("product_page_attempt", "success")
+                METRICS.increment("product_page", "success" if attempt == 0 else "retried")
+                return page_source
+            except Exception as e:
+                logging.error(f"Error getting product details for {product_url}: {e}", exc_info=True)
+                METRICS.increment("product_page_attempt", "error")
+                if attempt_span:
+                    attempt_span.outcome = "error"
+                if throttle:
+                    throttle.failure(type(e).__name__)
+                with METRICS.time("backoff_sleep"):
+                    time.sleep(throttle.backoff(attempt) if throttle else 2)
+    METRICS.increment("product_page", "failed")
+    return None
+
+
+def get_category_page(driver, page_url, throttle=None):
+    """Load a bestseller page in the browser, returning its HTML once the category navigation is there."""
+    try:
+        with METRICS.time("driver_get"):
+            driver.get(page_url)
+        if wait_for_element(driver, By.CSS_SELECTOR, NAV_LINK_SELECTOR, timeout=10):
+            if throttle:
+                throttle.success()
+            return driver.page_source
+        logging.warning(f"Category navigation not found at {page_url}")
+        if throttle:
+            throttle.failure("missing category navigation")
+    except Exception as e:
+        logging.error(f"Error loading category page {page_url}: {e}", exc_info=True)
+        if throttle:
+            throttle.failure(type(e).__name__)
+    return None
+
+
+def is_transient(status):
+    """Whether a failed HTTP fetch is worth retrying: no response (timeout, reset), 429 or a 5xx."""
+    return status is None or status == 429 or status >= 500
+
+
+def fetch_failed(status, attempt, attempts, throttle=None):
+    """Record a failed try at fetching a page and return whether to try again."""
+    if attempt == 0 and throttle:
+        # Once per page however many tries it takes, so one dead URL costs one back-off
+        throttle.failure(f"HTTP {status}" if status else "HTTP error")
+    if is_transient(status) and attempt + 1 < attempts:
+        return True
+    METRICS.increment("http_page", "failed")
+    return False
+
+
+def fetch_page_http(fetcher, url, throttle=None, attempts=HTTP_ATTEMPTS):
+    """Fetch a page over plain HTTP, retrying transient failures after a jittered backoff; None if it fails."""
+    for attempt in range(attempts):
+        page_source, status = fetcher.fetch_with_status(url)
+        if page_source:
+            METRICS.increment("http_page", "success" if attempt == 0 else "retried")
+            return page_source
+        if not fetch_failed(status, attempt, attempts, throttle):
+            return None
+        with METRICS.time("backoff_sleep"):
+            time.sleep(throttle.backoff(attempt) if throttle else 2)
+        if throttle:
+            throttle.wait()
+
+
+async def fetch_page_async(client, fetcher, url, throttle=None, attempts=HTTP_ATTEMPTS):
+    """fetch_page_http for the async engine: backoffs wait on the event loop and retries go through the limiter."""
+    for attempt in range(attempts):
+        page_source, status = await client.call(url, fetcher.fetch_with_status, url)
+        if page_source:
+            METRICS.increment("http_page", "success" if attempt == 0 else "retried")
+            return page_source
+        if not fetch_failed(status, attempt, attempts, throttle):
+            return None
+        with METRICS.time("backoff_sleep"):
+            await asyncio.sleep(throttle.backoff(attempt) if throttle else 2)
+
+
+def get_product_page_http(fetcher, product_url, throttle=None):
+    """Fetch a product page over plain HTTP, or return None if it needs a real browser."""
+    return check_product_page(fetch_page_http(fetcher, product_url, throttle), product_url, throttle)
+
+
+def check_product_page(page_source, product_url, throttle=None):
+    """The product page fetched over HTTP, or None if it failed or needs a real browser."""
+    if not page_source:
+        METRICS.increment("http_product_page", "error")
+        return None
+    if 'id="productTitle"' not in page_source:
+        METRICS.increment("http_product_page", "blocked")
+        # Captcha, bot check or a client-rendered page: let Selenium handle it
+        logging.info(f"Product title missing from HTTP response for {product_url}, falling back to browser")
+        if throttle:
+            throttle.failure("missing product title")
+        return None
+    METRICS.increment("http_product_page", "success")
+    if throttle:
+        throttle.success()
+    return page_source
+
+
+def iter_lazy_grid_items(driver, page_size=BESTSELLER_PAGE_SIZE, timeout=5):
+    """Yield grid cell HTML as rows load, scrolling only until the grid stops growing."""
+    seen_count = 0
+    while True:
+        items = driver.execute_script(GRID_ITEMS_SCRIPT)
+        yield from items[seen_count:]
+        seen_count = len(items)
+        if seen_count >= page_size:
+            return
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         try:
-            driver.get(product_url)
-            element = wait_for_element(driver, By.ID, "productTitle", timeout=10)
-            if not element:
-                logging.warning(f"Product title not found at {product_url}, attempt {attempt+1}")
-                time.sleep(2)
-                continue  # Retry
-
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            details = parse_product_details(soup, category_name, driver)
-            return details
-        except Exception as e:
-            logging.error(f"Error getting product details for {product_url}: {e}", exc_info=True)
-            time.sleep(2)
-    return {
-        "Category Name": category_name,
-        "Product Name": "N/A",
-        "Product Price": "N/A",
-        "Best Seller Rating": "N/A",
-        "Ship From": "N/A",
-        "Sold By": "N/A",
-        "Rating": "N/A",
-        "Product Description": "N/A",
-        "Number Bought in the Past Month": "N/A",
-        "All Available Images": "N/A"
-    }
-
-
-def get_category_products(driver, category_name, category_url, limit=10):
-    """Get product URLs from a category page."""
+            # Returns as soon as new rows appear, the timeout only ends the final poll
+            WebDriverWait(driver, timeout).until(
+                lambda d: d.execute_script(GRID_COUNT_SCRIPT) > seen_count
+            )
+        except TimeoutException:
+            return
+
+
+def iter_listing_page(driver, category_name, page_url, start_rank=1, cache=None):
+    """Yield (product URL, listing record) pairs from one bestseller page as its grid loads."""
+    page_source = cache.get(page_url) if cache else None
+    if page_source is not None:
+        with METRICS.time("listing_parse"):
+            listing = parse_category_listing(BeautifulSoup(page_source, 'html.parser'), category_name, None, start_rank)
+        # A page cached over HTTP lacks the lazy-loaded rows, which the browser can fill in
+        if not has_stubs(listing):
+            yield from listing
+            return
+    with METRICS.time("driver_get"):
+        driver.get(page_url)
+    # Wait for products to appear
+    if not wait_for_element(driver, By.CSS_SELECTOR, FACEOUT_SELECTOR):
+        logging.warning(f"No products found on category page: {page_url}")
+        return
+    rank = start_rank
+    for item_html in iter_lazy_grid_items(driver):
+        product_url, record = parse_faceout(BeautifulSoup(item_html, 'html.parser'), category_name, rank)
+        if product_url:
+            yield product_url, record
+            rank += 1
+    if cache:
+        cache.put(page_url, driver.page_source)
+
+
+def get_listing_page(driver, category_name, page_url, start_rank=1, cache=None):
+    """All (product URL, listing record) pairs on one bestseller page."""
+    return list(iter_listing_page(driver, category_name, page_url, start_rank, cache))
+
+
+def iter_category_listing(driver, category_name, category_url, limit=10, cache=None, pages=1):
+    """Yield (product URL, listing record) pairs from a category's bestseller pages as they are found."""
     logging.info(f"Scraping category: {category_name}")
-    products_data = []
+    found = 0
     try:
-        driver.get(category_url)
-        # Wait for products to appear
-        product_element = wait_for_element(driver, By.CSS_SELECTOR, "div.zg-grid-general-faceout")
-        if not product_element:
-            logging.warning(f"No products found on category page: {category_url}")
-            return products_data
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        products = soup.select("div.zg-grid-general-faceout")[:limit]
-
-        for prod in products:
-            link_el = prod.select_one("a.a-link-normal")
-            if not link_el:
-                continue
-            product_url = "https://www.amazon.in" + link_el.get("href")
-            product_details = get_product_details(driver, product_url, category_name)
-            products_data.append(product_details)
-            # Random sleep to reduce suspicion
-            time.sleep(random.uniform(2, 4))
+        for page in range(1, pages + 1):
+            page_count = 0
+            for entry in iter_listing_page(driver, category_name, category_page_url(category_url, page), found + 1, cache):
+                yield entry
+                found += 1
+                page_count += 1
+                if limit and found >= limit:
+                    return
+            if page_count < BESTSELLER_PAGE_SIZE:
+                # A short page is the last one
+                return
 
     except Exception as e:
         logging.error(f"Error scraping category {category_name}: {e}", exc_info=True)
 
-    return products_data
 
+def get_category_listing(driver, category_name, category_url, limit=10, cache=None, pages=1):
+    """All (product URL, listing record) pairs from a category's bestseller pages."""
+    return list(iter_category_listing(driver, category_name, category_url, limit, cache, pages))
+
+
+def fetch_product_page(driver, product_url, cache=None, throttle=None):
+    """Fetch one product page in the browser, pacing requests to the site."""
+    page_source = cache.get(product_url) if cache else None
+    if page_source is not None:
+        return page_source
+    if throttle:
+        throttle.wait()
+    page_source = get_product_page(driver, product_url, throttle=throttle)
+    if page_source is not None and cache:
+        cache.put(product_url, page_source)
+    if not throttle:
+        # Random sleep to reduce suspicion
+        with METRICS.time("polite_sleep"):
+            time.sleep(random.uniform(2, 4))
+    return page_source
+
+
+def fetch_product_page_http_first(pool, fetcher, product_url, cache=None, throttle=None):
+    """Fetch one product page over HTTP, borrowing a pooled browser only when that fails."""
+    page_source = cache.get(product_url) if cache else None
+    if page_source is not None:
+        return page_source
+    if throttle:
+        throttle.wait()
+    page_source = get_product_page_http(fetcher, product_url, throttle)
+    if page_source is None and pool:
+        page_source = pool.run(get_product_page, product_url, 2, throttle)
+    if page_source is not None and cache:
+        cache.put(product_url, page_source)
+    if not throttle:
+        # Random sleep to reduce suspicion
+        with METRICS.time("polite_sleep"):
+            time.sleep(random.uniform(2, 4))
+    return page_source
+
+
+def parse_listing_html(page_source, category_name, page_url, start_rank, cache=None):
+    """(product URL, listing record) pairs from a bestseller page's HTML, or [] if its grid is not there.
+
+    A page with a grid is stored in `cache`, so bot checks and error pages never are.
+    """
+    if not page_source:
+        return []
+    with METRICS.time("listing_parse"):
+        listing = parse_category_listing(BeautifulSoup(page_source, 'html.parser'), category_name, None, start_rank)
+    if listing and cache:
+        cache.put(page_url, page_source)
+    return listing
+
+
+def page_entries(listing, found, limit):
+    """The entries of a bestseller page still wanted after `found` products, and whether the category ends there."""
+    if limit and found + len(listing) >= limit:
+        return listing[:limit - found], True
+    # A short page is the last one
+    return listing, len(listing) < BESTSELLER_PAGE_SIZE
+
+
+def needs_browser(entries, page_url, pool, grid_values=False):
+    """Whether the wanted entries of a page fetched over HTTP must be loaded in a browser instead.
+
+    That is when its grid is missing, or when `grid_values` are needed and
+    some wanted rows were lazy-loaded stubs. Raises when stubs need a browser
+    and there is no pool, rather than write rows with no name, price or rating.
+    """
+    stubs = grid_values and has_stubs(entries)
+    if stubs and not pool:
+        raise RuntimeError(
+            f"{page_url} lazy-loads rows whose name, price and rating need a browser; "
+            f"drop --no-browser, or --listing-only and --incremental, which need them"
+        )
+    return bool(pool) and (not entries or stubs)
+
+
+def iter_category_listing_http(pool, fetcher, category_name, category_url, limit=10, cache=None, pages=1,
+                               throttle=None, grid_values=False):
+    """Yield (product URL, listing record) pairs from a category's bestseller pages over HTTP.
+
+    Pages whose grid is not in the server-rendered HTML are loaded in a pooled
+    browser, as are pages with lazy-loaded rows when `grid_values` (name,
+    price and rating) are needed for every row.
+    """
+    logging.info(f"Scraping category: {category_name}")
+    found = 0
+    for page in range(1, pages + 1):
+        page_url = category_page_url(category_url, page)
+        page_source = cache.get(page_url) if cache else None
+        if page_source is not None:
+            listing = parse_listing_html(page_source, category_name, page_url, found + 1)
+        else:
+            if throttle:
+                throttle.wait()
+            page_source = fetch_page_http(fetcher, page_url, throttle)
+            listing = parse_listing_html(page_source, category_name, page_url, found + 1, cache)
+        # Only the rows kept under the limit decide, the stubs further down often are not wanted
+        entries, last = page_entries(listing, found, limit)
+        if needs_browser(entries, page_url, pool, grid_values):
+            listing = pool.run(get_listing_page, category_name, page_url, found + 1, cache)
+            entries, last = page_entries(listing, found, limit)
+        yield from entries
+        found += len(entries)
+        if last:
+            return
+
+
+def write_without_page(product_url, listing_record, sink, journal=None, detail_fields=None, carry_forward=None):
+    """Write a product's record if it needs no page load, returning whether it did.
+
+    That is a record carried forward from the last snapshot, one already in
+    the journal, or the listing record itself when `detail_fields` is [].
+    """
+    category_name = listing_record["Category Name"]
+    # Asked first so every listed product's grid values are compared and stored
+    record = carry_forward(listing_record) if carry_forward and detail_fields != [] else None
+    if record is None and journal:
+        journaled = journal.product_record(product_url, category_name)
+        if journaled is not None:
+            # Already in the journal, so only written out again
+            journaled["Listing Rank"] = listing_record["Listing Rank"]
+            sink.write(journaled)
+            return True
+    if record is None and detail_fields == []:
+        record = listing_record
+    if record is None:
+        return False
+    if journal:
+        journal.add_product(product_url, category_name, record)
+    sink.write(record)
+    return True
+
+
+async def crawl_product_async(client, pool, fetcher, parse_stage, sink, product_url, listing_record, cache=None,
+                              journal=None, seen=None, detail_fields=None, carry_forward=None):
+    """Scrape one product for a category, fetching each product URL only once per run.
 
-def main():
+    With `detail_fields` set to a list only those fields come from the product
+    page; an empty list skips the page and writes the listing record as is.
+    `carry_forward(listing_record)` returns a stored record to reuse instead
+    of loading the page, or None.
+    """
+    if write_without_page(product_url, listing_record, sink, journal, detail_fields, carry_forward):
+        return
+    category_name = listing_record["Category Name"]
+    if seen is None:
+        seen = {}
+    # The category that starts the fetch journals it
+    owner = product_url not in seen
+    if owner:
+        seen[product_url] = asyncio.ensure_future(fetch_product_record_async(
+            client, pool, fetcher, parse_stage, product_url, category_name, cache, client.limiter.throttle
+        ))
+    else:
+        logging.info(f"{product_url} already scraped for another category, reusing it for {category_name}")
+    try:
+        record = merge_detail_record(listing_record, await seen[product_url], detail_fields)
+    except Exception as e:
+        # One failed product must not cancel the rest of the crawl, so keep its listing values
+        logging.error(f"Error scraping {product_url}: {e}", exc_info=True)
+        record = listing_record.copy()
+    if journal and owner:
+        journal.add_product(product_url, category_name, record)
+        # Later categories read it back from the journal, so the future need not be kept
+        seen.pop(product_url, None)
+    sink.write(record)
+
+
+async def fetch_product_record_async(client, pool, fetcher, parse_stage, product_url, category_name, cache=None,
+                                     throttle=None):
+    """Fetch one product over HTTP under the rate limiter, falling back to a pooled browser."""
+    with TRACER.span("product", trace=product_url, category=category_name, engine="async"):
+        page_source = cache.get(product_url) if cache else None
+        if page_source is None:
+            page_source = check_product_page(
+                await fetch_page_async(client, fetcher, product_url, throttle), product_url, throttle
+            )
+            if page_source is None and pool:
+                page_source = await client.call(product_url, pool.run, get_product_page, product_url, 2, throttle)
+            if page_source is not None and cache:
+                cache.put(product_url, page_source)
+        # submit() may block on backpressure, keep that off the event loop
+        future = await asyncio.to_thread(parse_stage.submit, page_source, category_name)
+    record = await asyncio.wrap_future(future)
+    record["ASIN"] = product_asin(product_url)
+    return record
+
+
+async def crawl_category_async(client, pool, fetcher, parse_stage, sink, category_name, category_url, limit=10,
+                               cache=None, journal=None, seen=None, pages=1, detail_fields=None, carry_forward=None):
+    """Scrape a category listing, starting on each product as soon as the listing reveals it."""
+    product_urls = journal.category_urls(category_url) if journal else None
+    tasks = []
+    if product_urls is None:
+        product_urls = []
+        async for product_url, listing_record in iter_category_listing_async(
+            client, pool, fetcher, category_name, category_url, limit, cache, pages,
+            detail_fields is not None or carry_forward is not None
+        ):
+            product_urls.append(product_url)
+            tasks.append(asyncio.ensure_future(crawl_product_async(
+                client, pool, fetcher, parse_stage, sink, product_url, listing_record, cache, journal, seen,
+                detail_fields, carry_forward
+            )))
+        if journal:
+            journal.add_category(category_name, category_url, product_urls)
+    else:
+        tasks = [
+            crawl_product_async(
+                client, pool, fetcher, parse_stage, sink, url, listing_stub(url, category_name, rank), cache,
+                journal, seen, detail_fields, carry_forward
+            )
+            for rank, url in enumerate(product_urls, 1)
+        ]
+    await asyncio.gather(*tasks)
+
+
+async def iter_category_listing_async(client, pool, fetcher, category_name, category_url, limit=10, cache=None,
+                                      pages=1, grid_values=False):
+    """iter_category_listing_http for the async engine, fetching under the client's rate limiter."""
+    logging.info(f"Scraping category: {category_name}")
+    found = 0
+    for page in range(1, pages + 1):
+        page_url = category_page_url(category_url, page)
+        page_source = cache.get(page_url) if cache else None
+        if page_source is not None:
+            listing = parse_listing_html(page_source, category_name, page_url, found + 1)
+        else:
+            page_source = await fetch_page_async(client, fetcher, page_url, client.limiter.throttle)
+            listing = parse_listing_html(page_source, category_name, page_url, found + 1, cache)
+        entries, last = page_entries(listing, found, limit)
+        if needs_browser(entries, page_url, pool, grid_values):
+            listing = await client.call(
+                page_url, pool.run, get_listing_page, category_name, page_url, found + 1, cache
+            )
+            entries, last = page_entries(listing, found, limit)
+        for entry in entries:
+            yield entry
+        found += len(entries)
+        if last:
+            return
+
+
+async def crawl_async(pool, fetcher, parse_stage, sink, categories, limit=10, rate=0.5, max_in_flight=4, cache=None,
+                      journal=None, throttle=None, pages=1, detail_fields=None, carry_forward=None):
+    """Crawl every category at once, sharing one per-host politeness budget."""
+    limiter = HostRateLimiter(rate, max_in_flight, throttle=throttle)
+    # Run-wide product URL -> fetch task, so a product listed in several categories is loaded once
+    seen = {}
+    with AsyncFetcher(limiter, max_workers=max_in_flight) as client:
+        await asyncio.gather(*(
+            crawl_category_async(
+                client, pool, fetcher, parse_stage, sink, name, url, limit, cache, journal, seen, pages,
+                detail_fields, carry_forward
+            )
+            for name, url in categories.items()
+        ))
+
+
+def unwrap_future(outer):
+    """A Future for the result of the Future that `outer` resolves to."""
+    result = Future()
+
+    def inner_done(inner):
+        try:
+            result.set_result(inner.result())
+        except Exception as e:
+            result.set_exception(e)
+
+    def outer_done(f):
+        try:
+            f.result().add_done_callback(inner_done)
+        except Exception as e:
+            result.set_exception(e)
+
+    outer.add_done_callback(outer_done)
+    return result
+
+
+def write_when_parsed(future, product_url, listing_record, sink, journal, detail_fields=None):
+    """Journal and write a product's record for one listing category as soon as it is parsed."""
+    def done(f):
+        try:
+            record = merge_detail_record(listing_record, f.result(), detail_fields)
+        except Exception as e:
+            logging.error(f"Error scraping {product_url}: {e}", exc_info=True)
+            record = listing_record.copy()
+        record["ASIN"] = product_asin(product_url)
+        if journal:
+            journal.add_product(product_url, listing_record["Category Name"], record)
+        sink.write(record)
+    future.add_done_callback(done)
+
+
+def fetch_category_page(pool, fetcher, page_url, cache=None, throttle=None):
+    """Fetch a bestseller page for its navigation, over HTTP first and in a pooled browser if that fails."""
+    page_source = cache.get(page_url) if cache else None
+    if page_source is not None:
+        return page_source
+    if throttle:
+        throttle.wait()
+    page_source = fetch_page_http(fetcher, page_url, throttle)
+    if (page_source is None or not has_category_nav(page_source)) and pool:
+        page_source = pool.run(get_category_page, page_url, throttle)
+    if page_source is not None and cache:
+        cache.put(page_url, page_source)
+    return page_source
+
+
+def load_category_tree(args, pool, make_fetcher, cache=None, throttle=None):
+    """The saved bestseller category tree, discovering (or finishing) it first when needed."""
+    tree = None if args.rediscover else CategoryTree.load(args.category_tree)
+    if tree and tree.complete and tree.max_depth >= args.discover_depth:
+        logging.info(f"Using {len(tree.nodes)} categories from {args.category_tree}")
+        return tree
+    root_url = rebase_url(BESTSELLERS_ROOT, args.base_url) if args.base_url else BESTSELLERS_ROOT
+    tree = tree or CategoryTree(args.category_tree, root_url)
+    with make_fetcher(args.workers) as fetcher:
+        discover_categories(
+            lambda url: fetch_category_page(pool, fetcher, url, cache, throttle),
+            tree, max_depth=args.discover_depth, workers=args.workers
+        )
+    return tree
+
+
+def work_on_queue(args, queue, pool, fetcher, parse_stage, cache=None, throttle=None):
+    """Run as a worker, scraping the category and product tasks a coordinator queued."""
+    def scrape_listing(category_name, category_url, limit, pages, detail_fields):
+        if args.engine == "selenium":
+            return pool.run(get_category_listing, category_name, category_url, limit, cache, pages)
+        return iter_category_listing_http(
+            pool, fetcher, category_name, category_url, limit, cache, pages, throttle, detail_fields is not None
+        )
+
+    def scrape_product(product_url, category_name):
+        with TRACER.span("product", trace=product_url, category=category_name, engine=args.engine):
+            if args.engine == "selenium":
+                page_source = pool.run(fetch_product_page, product_url, cache, throttle)
+            else:
+                page_source = fetch_product_page_http_first(pool, fetcher, product_url, cache, throttle)
+            if page_source is None:
+                # Failing the task hands it back to the queue for another attempt
+                raise RuntimeError(f"could not load product page {product_url}")
+            return parse_stage.submit(page_source, category_name).result()
+
+    return run_worker(
+        queue, scrape_listing, scrape_product, worker_id=args.worker_id, threads=args.workers,
+        lease_seconds=args.lease_seconds, heartbeat_interval=args.lease_seconds / 4
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Amazon.in bestseller categories.")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("SCRAPER_WORKERS", 4)),
+        help="Number of WebDriver instances used for product pages (default: 4)."
+    )
+    parser.add_argument(
+        "--engine", choices=["http", "selenium", "async"], default="http",
+        help="Fetch product pages over plain HTTP with a browser fallback, always use the browser, "
+             "or crawl all categories concurrently under a rate limit (default: http)."
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0.5,
+        help="Starting request rate in requests/sec. It rises while pages load cleanly and halves "
+             "on timeouts, bot checks and error pages (default: 0.5)."
+    )
+    parser.add_argument(
+        "--min-rate", type=float, default=0.05,
+        help="Lowest request rate the adaptive throttle backs off to (default: 0.05)."
+    )
+    parser.add_argument(
+        "--max-rate", type=float, default=2.0,
+        help="Highest request rate the adaptive throttle ramps up to (default: 2.0)."
+    )
+    parser.add_argument(
+        "--max-in-flight", type=int, default=4,
+        help="Concurrent requests allowed to each host by the async engine (default: 4)."
+    )
+    parser.add_argument(
+        "--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND,
+        help=f"HTML parser backend for product pages (default: {DEFAULT_BACKEND})."
+    )
+    parser.add_argument(
+        "--parse-workers", type=int, default=None,
+        help="Processes parsing product HTML in parallel with fetching, 0 parses on the fetch threads "
+             "(default: one per CPU)."
+    )
+    parser.add_argument(
+        "--cache-dir", default=".page_cache",
+        help="Directory for the on-disk page cache (default: .page_cache)."
+    )
+    parser.add_argument(
+        "--cache-ttl", type=float, default=6 * 3600,
+        help="Seconds a cached page stays fresh (default: 21600)."
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=float, default=500,
+        help="Size cap for the page cache in MB, least recently used pages are evicted first (default: 500)."
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always download pages instead of reading them from the page cache."
+    )
+    parser.add_argument(
+        "--journal", default="scrape_journal.jsonl",
+        help="Progress journal of finished pages and records (default: scrape_journal.jsonl)."
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Continue an interrupted run, skipping every page already in the journal."
+    )
+    parser.add_argument(
+        "--output", default="amazon_bestsellers_data.csv",
+        help="Output file, records are written as soon as they are parsed (default: amazon_bestsellers_data.csv)."
+    )
+    parser.add_argument(
+        "--format", choices=sorted(SINKS), default=None,
+        help="Output format, guessed from the --output extension by default."
+    )
+    parser.add_argument(
+        "--normalize", action="store_true",
+        help="Write typed columns (decimal price, float rating, int rank and number bought) with nulls "
+             "instead of display strings. Needs --format parquet or arrow."
+    )
+    parser.add_argument(
+        "--snapshot-db", default=None,
+        help="Also record this run as a snapshot in a SQLite history database, storing only changed products."
+    )
+    parser.add_argument(
+        "--images-dir",
+        help="Download every product image at full resolution into this directory, sharded by content hash, "
+             "and list the local files in the Local Images column."
+    )
+    parser.add_argument(
+        "--image-workers", type=int, default=8,
+        help="Concurrent image downloads with --images-dir (default: 8)."
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="With --snapshot-db, only load product pages for products that are new, whose rank, price or "
+             "rating on the bestseller grid changed since the last snapshot, or whose details are older "
+             "than --max-age; reuse the stored record for the rest. Implies --no-cache, so every "
+             "comparison is made against the live grid and refreshed products get their current page."
+    )
+    parser.add_argument(
+        "--max-age", type=float, default=24,
+        help="Hours a stored product record is reused by --incremental before its page is loaded again "
+             "(default: 24)."
+    )
+    parser.add_argument(
+        "--session-file", default=".amazon_session.json",
+        help="Where login cookies are saved and reused across runs (default: .amazon_session.json)."
+    )
+    parser.add_argument(
+        "--session-max-age", type=float, default=7 * 24,
+        help="Hours a saved login session is reused before logging in again (default: 168)."
+    )
+    parser.add_argument(
+        "--fresh-login", action="store_true",
+        help="Ignore any saved session and log in again."
+    )
+    parser.add_argument(
+        "--metrics-port", type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while the scraper runs."
+    )
+    parser.add_argument(
+        "--metrics-json", default="scrape_metrics.json",
+        help="Where to write the per-stage timing summary at the end of the run, or \"\" to skip it "
+             "(default: scrape_metrics.json)."
+    )
+    parser.add_argument(
+        "--trace",
+        help="Write nested timing spans for every product URL (fetch, wait, parse, retries, sleeps) to this "
+             "JSONL file."
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        help="With --trace, also export the run in Chrome trace-event format for chrome://tracing or Perfetto."
+    )
+    parser.add_argument(
+        "--no-login", action="store_true",
+        help="Scrape anonymously, without logging in or reusing a saved session."
+    )
+    parser.add_argument(
+        "--no-browser", action="store_true",
+        help="Never start Chrome: implies --no-login, and pages that fail over HTTP are given up on "
+             "instead of loaded in a browser."
+    )
+    parser.add_argument(
+        "--base-url",
+        help="Scrape another site with the same page layout instead of amazon.in, "
+             "e.g. a local stand-in server for benchmarks."
+    )
+    parser.add_argument(
+        "--limit", type=int, default=10,
+        help="Number of products to scrape per category (default: 10)."
+    )
+    parser.add_argument(
+        "--full-list", action="store_true",
+        help=f"Scrape the whole top {BESTSELLER_PAGES * BESTSELLER_PAGE_SIZE} of every category across "
+             f"all bestseller pages, ignoring --limit."
+    )
+    parser.add_argument(
+        "--discover", action="store_true",
+        help="Scrape every bestseller category and subcategory instead of the built-in four, "
+             "discovering the category tree first if it has not been saved yet."
+    )
+    parser.add_argument(
+        "--discover-depth", type=int, default=2,
+        help="How many levels below the bestsellers root to discover (default: 2)."
+    )
+    parser.add_argument(
+        "--category-tree", default="category_tree.json",
+        help="File the discovered category tree is saved to and reused from (default: category_tree.json)."
+    )
+    parser.add_argument(
+        "--rediscover", action="store_true",
+        help="Discover the category tree again even if a complete one is saved."
+    )
+    parser.add_argument(
+        "--listing-only", action="store_true",
+        help="Take name, price, rating and rank straight from the bestseller grid and skip product pages. "
+             "Bestseller pages whose lower rows load lazily are read in a browser; with --no-browser "
+             "such a page stops the run."
+    )
+    parser.add_argument(
+        "--detail-fields",
+        help="With --listing-only, comma-separated fields to still fetch from product pages "
+             "(e.g. \"Sold By,Ship From\")."
+    )
+    parser.add_argument(
+        "--role", choices=["coordinator", "worker"],
+        help="Split the crawl over several processes or machines: the coordinator queues the categories "
+             "and writes the output, workers scrape whatever is queued (default: do everything here)."
+    )
+    parser.add_argument(
+        "--queue", default="scrape_queue.db",
+        help="Task queue shared by the coordinator and workers: a SQLite file path, sqlite:///path.db "
+             "or redis://host:port/db (default: scrape_queue.db)."
+    )
+    parser.add_argument(
+        "--worker-id",
+        help="Name this worker's leases are held under (default: hostname-pid)."
+    )
+    parser.add_argument(
+        "--lease-seconds", type=float, default=120,
+        help="How long a worker may go without a heartbeat before its task is handed to another worker "
+             "(default: 120)."
+    )
+    args = parser.parse_args(argv)
+    if args.role == "coordinator":
+        # Workers do the scraping; the coordinator only fetches pages to --discover categories
+        args.no_browser = args.no_login = True
+        args.engine = "http"
+    elif args.role == "worker":
+        if args.engine == "async":
+            parser.error("--role worker needs the http or selenium engine")
+        if args.discover:
+            parser.error("--discover belongs on the coordinator, workers take categories from the queue")
+    if args.no_browser:
+        if args.engine == "selenium":
+            parser.error("--no-browser needs the http or async engine")
+        args.no_login = True
+    if args.incremental:
+        if not args.snapshot_db:
+            parser.error("--incremental needs --snapshot-db to compare against")
+        if args.role:
+            parser.error("--incremental is not supported with --role yet")
+        # A cached grid would hide changes for up to --cache-ttl, and carry stale records forward
+        args.no_cache = True
+    if args.chrome_trace and not args.trace:
+        parser.error("--chrome-trace needs --trace")
+    if args.detail_fields:
+        if not args.listing_only:
+            parser.error("--detail-fields needs --listing-only")
+        unknown = [field.strip() for field in args.detail_fields.split(",") if field.strip() not in FIELDNAMES]
+        if unknown:
+            parser.error(f"Unknown --detail-fields {', '.join(unknown)}, expected names from {', '.join(FIELDNAMES)}")
+    output_format = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if args.normalize and output_format not in COLUMNAR_FORMATS:
+        parser.error(f"--normalize needs a columnar output format ({', '.join(COLUMNAR_FORMATS)})")
+    return args
+
+
+def main(argv=None):
     """
     email = os.environ.get("AMAZON_EMAIL", "your_email@example.com")
     password = os.environ.get("AMAZON_PASSWORD", "your_password")
     """
     email = "your_email"
     password = "your_password"
-    driver = get_webdriver()
-    all_data = []
+    args = parse_args(argv)
+    set_default_backend(args.parser)
+    session = None
+    if not (args.fresh_login or args.no_login):
+        session = load_session(args.session_file, args.session_max_age * 3600)
+    # Cookies are tied to the browser they were issued to, so keep its user agent
+    user_agent = session["user_agent"] if session else random.choice(USER_AGENTS)
+    if args.base_url:
+        set_base_url(args.base_url)
+    driver = None
+    parse_stage = ParseStage(workers=args.parse_workers, backend=args.parser)
+    cache = None
+    if not args.no_cache:
+        cache = PageCache(args.cache_dir, ttl=args.cache_ttl, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    # Only the coordinator writes output in a distributed crawl, and the queue replaces the journal
+    journal = sink = None
+    if not args.role:
+        journal = ProgressJournal(args.journal, resume=args.resume)
+    throttle = AdaptiveThrottle(args.rate, min_rate=args.min_rate, max_rate=args.max_rate)
+    # The full list walks every bestseller page; otherwise --limit products fit on the first one
+    limit, pages = (None, BESTSELLER_PAGES) if args.full_list else (args.limit, 1)
+    # Fields taken from product pages: all of them, or only those asked for in listing-only mode
+    detail_fields = None
+    if args.listing_only:
+        detail_fields = [field.strip() for field in args.detail_fields.split(",")] if args.detail_fields else []
+    carry_forward = None
+    if args.role != "worker":
+        sinks = [open_sink(args.output, args.format, normalize=args.normalize), MetricsSink()]
+        if args.snapshot_db:
+            snapshot = SnapshotStore(args.snapshot_db)
+            sinks.append(snapshot)
+            if args.incremental:
+                carry_forward = functools.partial(snapshot.carry_forward, max_age=args.max_age * 3600)
+        sink = TeeSink(sinks)
+        if args.images_dir:
+            image_fetcher = HttpFetcher(user_agent, pool_size=args.image_workers)
+            sink = ImageStage(sink, ImageStore(args.images_dir), image_fetcher, max_in_flight=args.image_workers)
+    if args.metrics_port is not None:
+        METRICS.serve(args.metrics_port)
+    if args.trace:
+        TRACER.open(args.trace)
+
+    pool = None
 
     try:
-        # Login before scraping
-        login_amazon(driver, email, password)
+        if args.no_login:
+            logging.info("Scraping without logging in")
+        else:
+            driver = get_webdriver(user_agent)
+            if session and is_logged_in(restore_session(driver, session)):
+                logging.info(f"Reusing saved login session from {args.session_file}")
+            # Login before scraping
+            elif login_amazon(driver, email, password):
+                session = save_session(driver, args.session_file, user_agent)
+            else:
+                logging.warning("Login did not complete, scraping without a session.")
+                session = None
+
+        def make_driver():
+            # Every pooled browser shares the one login
+            new_driver = get_webdriver(user_agent)
+            return restore_session(new_driver, session) if session else new_driver
 
-        for category_name, category_url in category_urls.items():
-            category_data = get_category_products(driver, category_name, category_url, limit=10)
-            all_data.extend(category_data)
+        def make_fetcher(pool_size):
+            fetcher = HttpFetcher(user_agent, pool_size=pool_size)
+            if session:
+                apply_session_to_http(fetcher.session, session)
+            return fetcher
+
+        pool = None if args.no_browser else WebDriverPool(make_driver, size=args.workers)
+
+        categories = category_urls
+        if args.base_url:
+            categories = {name: rebase_url(url, args.base_url) for name, url in categories.items()}
+        if args.discover:
+            categories = load_category_tree(args, pool, make_fetcher, cache, throttle).categories()
+            logging.info(f"Scraping {len(categories)} discovered categories")
+
+        if args.role == "coordinator":
+            with open_queue(args.queue) as queue:
+                if not args.resume:
+                    queue.clear()
+                run_coordinator(queue, sink, categories, limit, pages, detail_fields)
+        elif args.role == "worker":
+            with open_queue(args.queue) as queue, make_fetcher(args.workers) as fetcher, parse_stage:
+                work_on_queue(args, queue, pool, fetcher, parse_stage, cache, throttle)
+        elif args.engine == "async":
+            fetcher = make_fetcher(args.max_in_flight)
+            with fetcher, parse_stage:
+                asyncio.run(crawl_async(
+                    pool, fetcher, parse_stage, sink, categories, limit=limit,
+                    rate=args.rate, max_in_flight=args.max_in_flight, cache=cache, journal=journal,
+                    throttle=throttle, pages=pages, detail_fields=detail_fields, carry_forward=carry_forward
+                ))
+        else:
+            # Product URL -> Future of its parsed record while in flight; after that the journal has it
+            product_futures = {}
+
+            def scrape_job(product_url, category_name):
+                # Fetchers hand raw HTML to the parse stage and move straight on to the next page
+                with TRACER.span("product", trace=product_url, category=category_name, engine=args.engine):
+                    if args.engine == "selenium":
+                        page_source = pool.run(fetch_product_page, product_url, cache, throttle)
+                    else:
+                        page_source = fetch_product_page_http_first(pool, fetcher, product_url, cache, throttle)
+                    return parse_stage.submit(page_source, category_name)
+
+            def discovered(product_url, listing_record):
+                if write_without_page(product_url, listing_record, sink, journal, detail_fields, carry_forward):
+                    return
+                category_name = listing_record["Category Name"]
+                future = product_futures.get(product_url)
+                if future is not None:
+                    logging.info(f"{product_url} already scraped for another category, reusing it for {category_name}")
+                    # The category that started the scrape journals it
+                    write_when_parsed(future, product_url, listing_record, sink, None, detail_fields)
+                    return
+                future = product_futures[product_url] = unwrap_future(
+                    executor.submit(scrape_job, product_url, category_name)
+                )
+                write_when_parsed(future, product_url, listing_record, sink, journal, detail_fields)
+                # Runs after the journal write above, which serves later categories from then on
+                future.add_done_callback(lambda _: product_futures.pop(product_url, None))
+
+            # Leaving the block waits for the fetchers, then for the parse stage to write the last records
+            fetcher = make_fetcher(args.workers)
+            with parse_stage, fetcher, ThreadPoolExecutor(max_workers=args.workers) as executor:
+                for category_name, category_url in categories.items():
+                    product_urls = journal.category_urls(category_url)
+                    if product_urls is not None:
+                        for rank, product_url in enumerate(product_urls, 1):
+                            product_url = canonical_product_url(product_url)
+                            discovered(product_url, listing_stub(product_url, category_name, rank))
+                        continue
+                    # Fetchers start on each product while the rest of the listing is still loading
+                    if args.engine == "selenium":
+                        driver = driver or make_driver()
+                        listing = iter_category_listing(driver, category_name, category_url, limit, cache, pages)
+                    else:
+                        listing = iter_category_listing_http(
+                            pool, fetcher, category_name, category_url, limit, cache, pages, throttle,
+                            # Listing-only rows and incremental comparisons both need the grid values
+                            detail_fields is not None or carry_forward is not None
+                        )
+                    product_urls = []
+                    for product_url, listing_record in listing:
+                        product_urls.append(product_url)
+                        discovered(product_url, listing_record)
+                    journal.add_category(category_name, category_url, product_urls)
     finally:
-        driver.quit()
-
-    logging.info("Scraping completed.")
-
-    fieldnames = [
-        "Category Name",
-        "Product Name",
-        "Product Price",
-        "Best Seller Rating",
-        "Ship From",
-        "Sold By",
-        "Rating",
-        "Product Description",
-        "Number Bought in the Past Month",
-        "All Available Images"
-    ]
-
-    with open("amazon_bestsellers_data.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-        writer.writeheader()
-        for item in all_data:
-            writer.writerow(item)
-
-    logging.info("Data saved to amazon_bestsellers_data.csv")
+        # Callbacks run last-registered first, and every one runs even if an earlier one raises
+        with contextlib.ExitStack() as cleanup:
+            cleanup.callback(TRACER.close)
+            if driver:
+                cleanup.callback(driver.quit)
+            if pool:
+                cleanup.callback(pool.close)
+            if journal:
+                cleanup.callback(journal.close)
+            if sink:
+                cleanup.callback(sink.close)
+
+    logging.info(
+        f"Scraping completed. Final request rate {throttle.rate:.2f} req/s "
+        f"({throttle.successes} clean page loads, {throttle.failures} failures)"
+    )
+    if cache:
+        cache.log_stats()
+        METRICS.increment("page_cache", "hit", cache.hits)
+        METRICS.increment("page_cache", "miss", cache.misses)
+    if sink:
+        logging.info(f"{sink.count} records saved to {args.output}")
+    METRICS.log_summary()
+    if args.metrics_json:
+        METRICS.write_json(args.metrics_json)
+        logging.info(f"Stage metrics written to {args.metrics_json}")
+    if args.trace and args.chrome_trace:
+        spans = export_chrome_trace(args.trace, args.chrome_trace)
+        logging.info(f"{spans} trace spans exported to {args.chrome_trace}")
 
 
 if __name__ == "__main__":
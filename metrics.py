@@ -0,0 +1,177 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracing import TRACER
+
+
+# Histogram upper bounds in seconds, from a cache hit up to the two-minute login wait
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus exposes them."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Estimate of the q-quantile, interpolated within its bucket like histogram_quantile()."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+
+class _Timing:
+    """Handle yielded by Metrics.time(); set `outcome` to record something other than success."""
+
+    def __init__(self):
+        self.outcome = "success"
+
+
+class Metrics:
+    """Run-wide counters and per-stage latency histograms, labelled by outcome.
+
+    Stages are timed with `with METRICS.time("driver_get") as timing:`; an
+    exception records the "error" outcome. Events without a duration (retries,
+    N/A records) are plain counters.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, outcome="success"):
+        with self._lock:
+            key = (stage, outcome)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.buckets)
+            self._histograms[key].observe(seconds)
+
+    def increment(self, event, outcome="success", amount=1):
+        with self._lock:
+            key = (event, outcome)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def time(self, stage):
+        """Time the block into the stage histogram, and as a trace span when tracing is on."""
+        timing = _Timing()
+        with TRACER.span(stage) as span:
+            start = time.perf_counter()
+            try:
+                yield timing
+            except BaseException:
+                timing.outcome = "error"
+                raise
+            finally:
+                self.observe(stage, time.perf_counter() - start, timing.outcome)
+                if span:
+                    span.outcome = timing.outcome
+
+    def to_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP scraper_stage_seconds Time spent in each scraper stage, by outcome.",
+            "# TYPE scraper_stage_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, outcome), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",outcome="{outcome}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'scraper_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'scraper_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"scraper_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"scraper_stage_seconds_count{{{labels}}} {histogram.count}")
+            lines.append("# HELP scraper_events_total Scraper events, by outcome.")
+            lines.append("# TYPE scraper_events_total counter")
+            for (event, outcome), count in sorted(self._counters.items()):
+                lines.append(f'scraper_events_total{{event="{event}",outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Per-stage count, total, mean and estimated p50/p95 seconds, plus event counts."""
+        stages = {}
+        events = {}
+        with self._lock:
+            for (stage, outcome), histogram in sorted(self._histograms.items()):
+                stages.setdefault(stage, {})[outcome] = {
+                    "count": histogram.count,
+                    "total_seconds": round(histogram.sum, 6),
+                    "mean_seconds": round(histogram.sum / histogram.count, 6),
+                    "p50_seconds": round(histogram.quantile(0.50), 6),
+                    "p95_seconds": round(histogram.quantile(0.95), 6),
+                }
+            for (event, outcome), count in sorted(self._counters.items()):
+                events.setdefault(event, {})[outcome] = count
+        return {"run_seconds": round(time.time() - self.started, 3), "stages": stages, "events": events}
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+            f.write("\n")
+
+    def log_summary(self, top=5):
+        """Log the stages that took the most total time, the likely bottleneck first."""
+        totals = {}
+        for stage, outcomes in self.summary()["stages"].items():
+            totals[stage] = sum(values["total_seconds"] for values in outcomes.values())
+        for stage, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]:
+            logging.info(f"Stage {stage}: {total:.1f}s total")
+
+    def serve(self, port, host="127.0.0.1"):
+        """Expose /metrics for Prometheus on a background thread and return the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+# Shared by every module in a run
+METRICS = Metrics()
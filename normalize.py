@@ -0,0 +1,146 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is only needed for the columnar batch path
+    pa = None
+
+
+# Patterns shared by the per-value helpers and the vectorized batch path (RE2 compatible)
+# The first amount only, so a ranged price like "₹199.00 - ₹499.00" gives its lower bound
+PRICE_PATTERN = r"(?P<price>[0-9][0-9,]*(?:\.[0-9]+)?)"
+RATING_PATTERN = r"(?P<rating>[0-9]+(?:\.[0-9]+)?) out of"
+RANK_PATTERN = r"#(?P<rank>[0-9][0-9,]*) in (?P<category>[^(#]+)"
+BOUGHT_PATTERN = r"(?P<count>[0-9]+(?:\.[0-9]+)?)(?P<unit>[KkMm]?)\+? bought in past month"
+
+_UNIT_MULTIPLIERS = {"": 1, "K": 1000, "M": 1000000}
+MISSING = "N/A"
+
+
+def _present(value):
+    return value is not None and value != MISSING and value != ""
+
+
+def parse_price(value):
+    """'₹1,299.00' -> Decimal('1299.00'), '₹199.00 - ₹499.00' -> Decimal('199.00'), or None."""
+    match = re.search(PRICE_PATTERN, value) if _present(value) else None
+    if not match:
+        return None
+    try:
+        return Decimal(match.group("price").replace(",", ""))
+    except InvalidOperation:
+        return None
+
+
+def parse_rating(value):
+    """'4.1 out of 5' -> 4.1, or None."""
+    match = re.search(RATING_PATTERN, value) if _present(value) else None
+    return float(match.group("rating")) if match else None
+
+
+def parse_rank(value):
+    """'Best Sellers Rank: #12 in Home & Kitchen (...)' -> (12, 'Home & Kitchen'), or (None, None)."""
+    match = re.search(RANK_PATTERN, value) if _present(value) else None
+    if not match:
+        return None, None
+    return int(match.group("rank").replace(",", "")), match.group("category").strip()
+
+
+def parse_number_bought(value):
+    """'1K+ bought in past month' -> 1000, or None."""
+    match = re.search(BOUGHT_PATTERN, value) if _present(value) else None
+    if not match:
+        return None
+    return int(float(match.group("count")) * _UNIT_MULTIPLIERS[match.group("unit").upper()])
+
+
+if pa is not None:
+    NORMALIZED_SCHEMA = pa.schema([
+        ("category", pa.string()),
+        ("product_name", pa.string()),
+        ("price", pa.decimal128(12, 2)),
+        ("best_seller_rank", pa.int64()),
+        ("best_seller_category", pa.string()),
+        ("ship_from", pa.string()),
+        ("sold_by", pa.string()),
+        ("rating", pa.float64()),
+        ("description", pa.string()),
+        ("bought_past_month", pa.int64()),
+        ("images", pa.list_(pa.string())),
+        ("asin", pa.string()),
+        ("listing_rank", pa.int64()),
+        ("local_images", pa.list_(pa.string())),
+    ])
+
+
+def _string_column(records, key):
+    """Column of raw display strings with the "N/A" sentinel turned into nulls."""
+    column = pa.array([record.get(key) for record in records], pa.string())
+    return pc.if_else(pc.equal(column, MISSING), pa.scalar(None, pa.string()), column)
+
+
+def _extract(column, pattern, field):
+    """One named group of a regex match per row, null where the row does not match."""
+    matches = pc.extract_regex(column, pattern)
+    values = pc.struct_field(matches, field)
+    return pc.if_else(pc.is_valid(matches), values, pa.scalar(None, pa.string()))
+
+
+def _cast_or_null(column, to_type):
+    """Cast a string column, with null for any value that does not fit `to_type`."""
+    try:
+        return pc.cast(column, to_type)
+    except pa.ArrowInvalid:
+        pass
+    # Rare, so find the offending values one at a time rather than fail the whole batch
+    values = []
+    for value in column:
+        try:
+            values.append(pc.cast(value, to_type).as_py())
+        except pa.ArrowInvalid:
+            values.append(None)
+    return pa.array(values, to_type)
+
+
+def normalize_batch(records):
+    """Turn a batch of display-string records into a typed Arrow table.
+
+    Every column is converted with Arrow compute kernels over the whole batch,
+    so the cost per row stays in C++ rather than in Python.
+    """
+    if pa is None:
+        raise ImportError("Typed output needs pyarrow installed: pip install pyarrow")
+
+    price = pc.replace_substring(_extract(_string_column(records, "Product Price"), PRICE_PATTERN, "price"), ",", "")
+
+    rank_text = _string_column(records, "Best Seller Rating")
+    rank = pc.replace_substring(_extract(rank_text, RANK_PATTERN, "rank"), ",", "")
+    rank_category = pc.utf8_trim_whitespace(_extract(rank_text, RANK_PATTERN, "category"))
+
+    bought_text = _string_column(records, "Number Bought in the Past Month")
+    bought_count = pc.cast(_extract(bought_text, BOUGHT_PATTERN, "count"), pa.float64())
+    unit = pc.utf8_upper(_extract(bought_text, BOUGHT_PATTERN, "unit"))
+    multiplier = pc.case_when(
+        pc.make_struct(pc.equal(unit, "K"), pc.equal(unit, "M")),
+        pa.scalar(1000.0), pa.scalar(1000000.0), pa.scalar(1.0)
+    )
+
+    columns = [
+        _string_column(records, "Category Name"),
+        _string_column(records, "Product Name"),
+        _cast_or_null(price, pa.decimal128(12, 2)),
+        pc.cast(rank, pa.int64()),
+        rank_category,
+        _string_column(records, "Ship From"),
+        _string_column(records, "Sold By"),
+        pc.cast(_extract(_string_column(records, "Rating"), RATING_PATTERN, "rating"), pa.float64()),
+        _string_column(records, "Product Description"),
+        pc.cast(pc.multiply(bought_count, multiplier), pa.int64()),
+        pc.split_pattern(_string_column(records, "All Available Images"), "\n"),
+        _string_column(records, "ASIN"),
+        _cast_or_null(_string_column(records, "Listing Rank"), pa.int64()),
+        pc.split_pattern(_string_column(records, "Local Images"), "\n"),
+    ]
+    return pa.Table.from_arrays(columns, schema=NORMALIZED_SCHEMA)
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from urls import canonical_url
+
+
+class PageCache:
+    """On-disk HTML cache keyed by the hash of the canonical URL.
+
+    Entries older than `ttl` seconds are treated as misses. When the cache
+    grows past `max_bytes` the least recently read entries are evicted.
+    """
+
+    def __init__(self, directory=".page_cache", ttl=6 * 3600, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._entries())
+
+    def _path(self, url):
+        key = hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".html")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".html"):
+                    yield os.path.join(root, name)
+
+    def get(self, url):
+        """Return the cached HTML for url, or None on a miss."""
+        path = self._path(url)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with open(path, encoding="utf-8") as f:
+                page_source = f.read()
+            # Bump the access time for LRU eviction, keep mtime for the TTL
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return page_source
+
+    def put(self, url, page_source):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = page_source.encode("utf-8")
+        # Write to a temp file and rename so readers never see a partial page
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - old_size
+            over_limit = self._size > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def evict(self):
+        """Drop least recently read entries until the cache is back under 90% of max_bytes."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, path))
+        entries.sort()
+        target = self.max_bytes * 0.9
+        for _, path in entries:
+            if self._size <= target:
+                break
+            self._remove(path)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size_bytes": self._size,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(
+            f"Page cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['size_bytes'] / 1024 / 1024:.1f} MB on disk"
+        )
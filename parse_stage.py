@@ -0,0 +1,87 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from metrics import METRICS
+from parsers import empty_product_record, parse_product_page
+from tracing import TRACER
+
+
+def _parse_or_empty(page_source, category_name, backend):
+    """Parse in a worker process, turning parser errors into an N/A record.
+
+    Returns (record, outcome, seconds); metrics live in the parent process, so
+    the worker reports its timing back with the record.
+    """
+    start = time.perf_counter()
+    try:
+        record = parse_product_page(page_source, category_name, backend)
+        outcome = "success" if record.get("Product Name", "N/A") != "N/A" else "na_fallback"
+    except Exception as e:
+        logging.error(f"Error parsing product page for {category_name}: {e}", exc_info=True)
+        record, outcome = empty_product_record(category_name), "error"
+    return record, outcome, time.perf_counter() - start
+
+
+def _record_parse(result, parent=None):
+    record, outcome, seconds = result
+    METRICS.observe("parse", seconds, outcome)
+    TRACER.record("parse", time.time() - seconds, seconds, parent, outcome)
+    return record
+
+
+def _completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class ParseStage:
+    """Parses fetched product HTML on a process pool, decoupled from the fetch threads.
+
+    At most `max_pending` pages are queued or being parsed at once; submit()
+    blocks fetchers beyond that, so a slow parse stage pushes back on the
+    network side instead of piling HTML up in memory. With workers=0 pages are
+    parsed inline on the calling thread.
+    """
+
+    def __init__(self, workers=None, max_pending=None, backend=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.backend = backend
+        self._executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        self._pending = threading.BoundedSemaphore(max_pending or max(1, self.workers) * 2)
+
+    def submit(self, page_source, category_name):
+        """Queue a page for parsing and return a Future for its record."""
+        if page_source is None:
+            # Fetch gave up on this product, nothing to parse
+            return _completed(empty_product_record(category_name))
+        # Parsing finishes on another thread, so keep the trace span it belongs under
+        parent = TRACER.current()
+        if self._executor is None:
+            return _completed(_record_parse(_parse_or_empty(page_source, category_name, self.backend), parent))
+        self._pending.acquire()
+        future = self._executor.submit(_parse_or_empty, page_source, category_name, self.backend)
+        record_future = Future()
+
+        def done(f):
+            self._pending.release()
+            try:
+                record_future.set_result(_record_parse(f.result(), parent))
+            except Exception as e:
+                record_future.set_exception(e)
+
+        future.add_done_callback(done)
+        return record_future
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
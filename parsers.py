@@ -0,0 +1,340 @@
+import re
+
+from bs4 import BeautifulSoup
+
+from embedded_json import extract_embedded_fields
+from record import ProductRecord
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional, the bs4 backend works without it
+    lxml = None
+
+
+# Row labels in the tabular buybox; a value runs until the next one
+_BUYBOX_LABELS = (
+    "Ships from", "Sold by", "Fulfilled by", "Payment", "Returns", "Packaging", "Gift options", "Description",
+    "Details",
+)
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def _tabular_value(text, label):
+    """Value following `label` in flattened tabular buybox text, or ""."""
+    idx = text.find(label)
+    if idx == -1:
+        return ""
+    rest = text[idx + len(label):]
+    end = min((rest.find(other) for other in _BUYBOX_LABELS if other in rest), default=len(rest))
+    return rest[:end].strip()
+
+
+def _merchant_info_fields(text):
+    """(Ship From, Sold By) from lines like "Ships from and sold by X." or "Sold by X and Fulfilled by Amazon."."""
+    text = " ".join(text.split()).rstrip(" .")
+    both = re.search(r"ships from and sold by (.+)", text, re.I)
+    if both:
+        return both.group(1), both.group(1)
+    ship_from = sold_by = "N/A"
+    sold = re.search(r"sold by (.+?)(?: and (fulfilled by amazon))?$", text, re.I)
+    if sold:
+        sold_by = sold.group(1)
+        if sold.group(2):
+            ship_from = "Amazon"
+    ships = re.search(r"ships from (.+?)(?: and |$)", text, re.I)
+    if ships:
+        ship_from = ships.group(1)
+    return ship_from, sold_by
+
+
+def _best_seller_rank(item_texts):
+    """The "Best Sellers Rank: ..." product detail, from the texts of the detail list items."""
+    for text in item_texts:
+        idx = text.find("Best Sellers Rank")
+        if idx != -1:
+            return text[idx:].strip()
+    return "N/A"
+
+
+def _bought_text(line):
+    """Text of the source line holding the "bought in past month" badge, without its markup."""
+    return " ".join(_TAG_PATTERN.sub(" ", line).split()) or "N/A"
+
+
+def parse_product_details(soup, category_name, page_source):
+    # The page's embedded JSON comes first, the DOM only fills in the fields it lacks
+    embedded = extract_embedded_fields(page_source)
+
+    # Product Name
+    product_name = embedded.get("Product Name")
+    if product_name is None:
+        title_el = soup.select_one("#productTitle")
+        product_name = title_el.get_text(strip=True) if title_el else "N/A"
+
+    # Price
+    product_price = embedded.get("Product Price")
+    if product_price is None:
+        price_el = soup.select_one("#corePrice_feature_div .a-offscreen, #apex_desktop .a-offscreen")
+        product_price = price_el.get_text(strip=True) if price_el else "N/A"
+
+    # Rating (detailed rating)
+    rating = embedded.get("Rating")
+    if rating is None:
+        rating_el = soup.select_one("span[data-hook='rating-out-of-text']")
+        rating = rating_el.get_text(strip=True) if rating_el else "N/A"
+
+    # Best Seller Rating
+    best_seller_rating = "N/A"
+    detail_wrapper = soup.select_one("#detailBulletsWrapper_feature_div")
+    if detail_wrapper:
+        best_seller_rating = _best_seller_rank(li.get_text(" ", strip=True) for li in detail_wrapper.select("li"))
+
+    # Ship From and Sold By
+    ship_from = "N/A"
+    sold_by = "N/A"
+
+    # Try tabular buybox first, reading its labelled cells and falling back to its flattened text
+    tabular_box = soup.select_one("#tabular-buybox")
+    if tabular_box:
+        cells = {}
+        for cell in tabular_box.select("[tabular-attribute-name]"):
+            message = cell.select_one(".tabular-buybox-text-message")
+            if message:
+                cells.setdefault(cell["tabular-attribute-name"], message.get_text(" ", strip=True))
+        tb_text = tabular_box.get_text(" ", strip=True)
+        ship_from = cells.get("Ships from") or _tabular_value(tb_text, "Ships from") or "N/A"
+        sold_by = cells.get("Sold by") or _tabular_value(tb_text, "Sold by") or "N/A"
+    else:
+        merchant_info = soup.select_one("#merchant-info")
+        if merchant_info:
+            ship_from, sold_by = _merchant_info_fields(merchant_info.get_text(" ", strip=True))
+    sold_by = embedded.get("Sold By", sold_by)
+
+    # Product Description
+    product_description = "N/A"
+    feature_bullets = soup.select_one("#feature-bullets")
+    if feature_bullets:
+        bullets = feature_bullets.select("li")
+        bullet_points = [b.get_text(strip=True) for b in bullets if b.get_text(strip=True)]
+        if bullet_points:
+            product_description = "\n".join(bullet_points)
+    else:
+        desc_fallback = soup.select_one("#productDescription")
+        if desc_fallback:
+            desc_text = desc_fallback.get_text(" ", strip=True)
+            if desc_text:
+                product_description = desc_text
+
+    # Number Bought in the Past Month (Not always present)
+    number_bought = "N/A"
+    if "bought in past month" in page_source:
+        for line in page_source.split("\n"):
+            if "bought in past month" in line:
+                number_bought = _bought_text(line)
+                break
+
+    images_multiline = embedded.get("All Available Images")
+    if images_multiline is None:
+        image_elements = soup.select("#imageBlockContainer img")
+        image_urls = []
+        for img in image_elements:
+            src = img.get("src")
+            if src and "data:image" not in src:
+                image_urls.append(src)
+
+        # Drop repeats but keep page order, so the same page always gives the same record
+        images_multiline = "\n".join(dict.fromkeys(image_urls)) if image_urls else "N/A"
+
+    return ProductRecord(
+        category=category_name,
+        name=product_name,
+        price=product_price,
+        best_seller_rank=best_seller_rating,
+        ship_from=ship_from,
+        sold_by=sold_by,
+        rating=rating,
+        description=product_description,
+        bought_past_month=number_bought,
+        images=images_multiline,
+    )
+
+
+def parse_bs4(page_source, category_name):
+    """Reference backend: BeautifulSoup with the stdlib html.parser."""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    return parse_product_details(soup, category_name, page_source)
+
+
+# Elements the lxml backend looks for while walking the tree, keyed by id
+_LXML_ANCHOR_IDS = frozenset([
+    "productTitle",
+    "corePrice_feature_div",
+    "apex_desktop",
+    "detailBulletsWrapper_feature_div",
+    "tabular-buybox",
+    "merchant-info",
+    "feature-bullets",
+    "productDescription",
+    "imageBlockContainer",
+])
+
+if lxml is not None:
+    _XP_TEXT = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+    _XP_OFFSCREEN = etree.XPath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' a-offscreen ')]")
+    _XP_LI = etree.XPath(".//li")
+    _XP_IMG = etree.XPath(".//img")
+    _XP_BUYBOX_CELLS = etree.XPath(".//*[@tabular-attribute-name]")
+    _XP_BUYBOX_MESSAGE = etree.XPath(
+        ".//*[contains(concat(' ', normalize-space(@class), ' '), ' tabular-buybox-text-message ')]"
+    )
+
+_BOUGHT_MARKER = "bought in past month"
+
+
+def _lxml_text(el, separator=""):
+    """Equivalent of bs4's get_text(separator, strip=True) for an lxml element."""
+    if el is None:
+        return ""
+    return separator.join(s.strip() for s in _XP_TEXT(el) if s.strip())
+
+
+def _find_line(page_source, marker):
+    """Return the stripped source line containing marker, without splitting the whole page."""
+    idx = page_source.find(marker)
+    if idx == -1:
+        return ""
+    start = page_source.rfind("\n", 0, idx) + 1
+    end = page_source.find("\n", idx)
+    return page_source[start:end if end != -1 else len(page_source)].strip()
+
+
+def parse_lxml(page_source, category_name):
+    """Fast backend: parse once with lxml and collect every field in one tree walk."""
+    root = lxml.html.fromstring(page_source)
+
+    # Single pass over the tree to find the anchor elements every field hangs off
+    anchors = {}
+    anchor_order = []
+    rating_el = None
+    for el in root.iter():
+        el_id = el.get("id")
+        if el_id in _LXML_ANCHOR_IDS and el_id not in anchors:
+            anchors[el_id] = el
+            anchor_order.append(el_id)
+        elif rating_el is None and el.tag == "span" and el.get("data-hook") == "rating-out-of-text":
+            rating_el = el
+
+    # The page's embedded JSON comes first, the DOM only fills in the fields it lacks
+    embedded = extract_embedded_fields(page_source)
+
+    # Product Name
+    product_name = embedded.get("Product Name") or _lxml_text(anchors.get("productTitle")) or "N/A"
+
+    # Price, the first offscreen price in document order across both price blocks
+    product_price = embedded.get("Product Price")
+    if product_price is None:
+        product_price = "N/A"
+        for anchor_id in anchor_order:
+            if anchor_id in ("corePrice_feature_div", "apex_desktop"):
+                offscreen = _XP_OFFSCREEN(anchors[anchor_id])
+                if offscreen:
+                    product_price = _lxml_text(offscreen[0]) or "N/A"
+                    break
+
+    # Rating
+    rating = embedded.get("Rating") or _lxml_text(rating_el) or "N/A"
+
+    # Best Seller Rating
+    best_seller_rating = "N/A"
+    if "detailBulletsWrapper_feature_div" in anchors:
+        best_seller_rating = _best_seller_rank(
+            _lxml_text(li, " ") for li in _XP_LI(anchors["detailBulletsWrapper_feature_div"])
+        )
+
+    # Ship From and Sold By
+    ship_from = "N/A"
+    sold_by = "N/A"
+    if "tabular-buybox" in anchors:
+        cells = {}
+        for cell in _XP_BUYBOX_CELLS(anchors["tabular-buybox"]):
+            message = _XP_BUYBOX_MESSAGE(cell)
+            if message:
+                cells.setdefault(cell.get("tabular-attribute-name"), _lxml_text(message[0], " "))
+        tb_text = _lxml_text(anchors["tabular-buybox"], " ")
+        ship_from = cells.get("Ships from") or _tabular_value(tb_text, "Ships from") or "N/A"
+        sold_by = cells.get("Sold by") or _tabular_value(tb_text, "Sold by") or "N/A"
+    elif "merchant-info" in anchors:
+        ship_from, sold_by = _merchant_info_fields(_lxml_text(anchors["merchant-info"], " "))
+    sold_by = embedded.get("Sold By", sold_by)
+
+    # Product Description
+    product_description = "N/A"
+    if "feature-bullets" in anchors:
+        bullet_points = [t for t in (_lxml_text(li) for li in _XP_LI(anchors["feature-bullets"])) if t]
+        if bullet_points:
+            product_description = "\n".join(bullet_points)
+    elif "productDescription" in anchors:
+        product_description = _lxml_text(anchors["productDescription"], " ") or "N/A"
+
+    # Number Bought in the Past Month, straight from the HTML already in hand
+    number_bought = _bought_text(_find_line(page_source, _BOUGHT_MARKER))
+
+    images_multiline = embedded.get("All Available Images")
+    if images_multiline is None:
+        image_urls = []
+        if "imageBlockContainer" in anchors:
+            for img in _XP_IMG(anchors["imageBlockContainer"]):
+                src = img.get("src")
+                if src and "data:image" not in src:
+                    image_urls.append(src)
+        # Drop repeats but keep page order, so the same page always gives the same record
+        images_multiline = "\n".join(dict.fromkeys(image_urls)) if image_urls else "N/A"
+
+    return ProductRecord(
+        category=category_name,
+        name=product_name,
+        price=product_price,
+        best_seller_rank=best_seller_rating,
+        ship_from=ship_from,
+        sold_by=sold_by,
+        rating=rating,
+        description=product_description,
+        bought_past_month=number_bought,
+        images=images_multiline,
+    )
+
+
+def empty_product_record(category_name):
+    """Record used when a product page could not be fetched or parsed."""
+    return ProductRecord(category=category_name)
+
+
+PARSER_BACKENDS = {
+    "bs4": parse_bs4,
+    "lxml": parse_lxml,
+}
+
+DEFAULT_BACKEND = "lxml" if lxml is not None else "bs4"
+
+
+def get_parser(name=None):
+    """Look up a parser backend by name, defaulting to the fastest one installed."""
+    name = name or DEFAULT_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {name!r}, expected one of {sorted(PARSER_BACKENDS)}")
+    if name == "lxml" and lxml is None:
+        raise ImportError("The lxml parser backend needs lxml installed: pip install lxml")
+    return PARSER_BACKENDS[name]
+
+
+def set_default_backend(name):
+    """Choose the backend used when parse_product_page is called without one."""
+    global DEFAULT_BACKEND
+    get_parser(name)
+    DEFAULT_BACKEND = name
+
+
+def parse_product_page(page_source, category_name, backend=None):
+    """Parse a product page's HTML into a record with the chosen backend."""
+    return get_parser(backend)(page_source, category_name)
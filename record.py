@@ -0,0 +1,116 @@
+import sys
+
+
+# Output columns, in order
+FIELDNAMES = [
+    "Category Name",
+    "Product Name",
+    "Product Price",
+    "Best Seller Rating",
+    "Ship From",
+    "Sold By",
+    "Rating",
+    "Product Description",
+    "Number Bought in the Past Month",
+    "All Available Images",
+    "ASIN",
+    "Listing Rank",
+    "Local Images"
+]
+
+# Column name -> ProductRecord attribute
+FIELD_ATTRS = dict(zip(FIELDNAMES, (
+    "category", "name", "price", "best_seller_rank", "ship_from", "sold_by", "rating", "description",
+    "bought_past_month", "images", "asin", "listing_rank", "local_images",
+)))
+
+# Values shared by many products; interning keeps one copy of each string per process
+INTERNED_ATTRS = ("category", "ship_from", "sold_by")
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class ProductRecord:
+    """One product row, with "N/A" for anything that could not be scraped.
+
+    Slots instead of a per-record dict keep a crawl's records small, and
+    category, seller and ship-from strings are interned. Records still read
+    and write by column name (record["Sold By"], record.get(...)), so they
+    go straight into csv.DictWriter and the other sinks.
+    """
+
+    # Written out rather than @dataclass(slots=True), which needs Python 3.10
+    __slots__ = tuple(FIELD_ATTRS.values())
+    __hash__ = None
+
+    def __init__(self, category="N/A", name="N/A", price="N/A", best_seller_rank="N/A", ship_from="N/A",
+                 sold_by="N/A", rating="N/A", description="N/A", bought_past_month="N/A", images="N/A",
+                 asin="N/A", listing_rank="N/A", local_images="N/A"):
+        self.category = _intern(category)
+        self.name = name
+        self.price = price
+        self.best_seller_rank = best_seller_rank
+        self.ship_from = _intern(ship_from)
+        self.sold_by = _intern(sold_by)
+        self.rating = rating
+        self.description = description
+        self.bought_past_month = bought_past_month
+        self.images = images
+        self.asin = asin
+        self.listing_rank = listing_rank
+        self.local_images = local_images
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a column-name dict, such as a JSON journal line."""
+        return cls(**{FIELD_ATTRS[key]: value for key, value in data.items() if key in FIELD_ATTRS})
+
+    def to_dict(self):
+        return {key: getattr(self, attr) for key, attr in FIELD_ATTRS.items()}
+
+    def copy(self, **changes):
+        """A new record with the same values, and any attributes given replaced."""
+        values = {attr: getattr(self, attr) for attr in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+    def __repr__(self):
+        values = ", ".join(f"{attr}={getattr(self, attr)!r}" for attr in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+    def __reduce__(self):
+        # Rebuilt through __init__, so records parsed in worker processes are interned on arrival
+        return (type(self), tuple(getattr(self, attr) for attr in FIELD_ATTRS.values()))
+
+    def __getitem__(self, key):
+        return getattr(self, FIELD_ATTRS[key])
+
+    def __setitem__(self, key, value):
+        attr = FIELD_ATTRS[key]
+        setattr(self, attr, _intern(value) if attr in INTERNED_ATTRS else value)
+
+    def get(self, key, default=None):
+        attr = FIELD_ATTRS.get(key)
+        return getattr(self, attr) if attr else default
+
+    def keys(self):
+        return FIELD_ATTRS.keys()
+
+    def items(self):
+        return ((key, getattr(self, attr)) for key, attr in FIELD_ATTRS.items())
+
+    def __iter__(self):
+        return iter(FIELD_ATTRS)
+
+    def __contains__(self, key):
+        return key in FIELD_ATTRS
+
+    def __len__(self):
+        return len(FIELD_ATTRS)
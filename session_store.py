@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import time
+
+from selenium.webdriver.common.by import By
+
+
+HOME_URL = "https://www.amazon.in/"
+
+
+def save_session(driver, path, user_agent):
+    """Save the driver's cookies, and the user agent they were issued to, for later runs."""
+    session = {
+        "saved_at": time.time(),
+        "user_agent": user_agent,
+        "cookies": driver.get_cookies(),
+    }
+    # Cookies are credentials, keep the file private to the user
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(session, f)
+    logging.info(f"Saved login session to {path}")
+    return session
+
+
+def load_session(path, max_age=7 * 24 * 3600):
+    """Load a saved session, or None if there is none or it has expired."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            session = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    now = time.time()
+    if now - session.get("saved_at", 0) > max_age:
+        logging.info(f"Saved session in {path} is older than {max_age / 3600:.0f} hours, logging in again")
+        return None
+    expired = [c["name"] for c in session.get("cookies", []) if c.get("expiry") and c["expiry"] < now]
+    if expired:
+        logging.info(f"Saved session cookies have expired ({', '.join(expired)}), logging in again")
+        return None
+    return session
+
+
+def restore_session(driver, session):
+    """Load the saved cookies into a driver and return it."""
+    # Cookies can only be set for the domain the browser is currently on
+    driver.get(HOME_URL)
+    driver.delete_all_cookies()
+    for cookie in session["cookies"]:
+        cookie = dict(cookie)
+        if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+            cookie.pop("sameSite", None)
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            logging.warning(f"Could not restore cookie {cookie.get('name')}: {e}")
+    driver.get(HOME_URL)
+    return driver
+
+
+def apply_session_to_http(http_session, session):
+    """Copy the saved cookies into a requests.Session."""
+    for cookie in session["cookies"]:
+        http_session.cookies.set(
+            cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/")
+        )
+
+
+def is_logged_in(driver):
+    """True if the page in the driver shows a signed-in account greeting."""
+    try:
+        greeting = driver.find_element(By.ID, "nav-link-accountList-nav-line-1").text
+    except Exception:
+        return False
+    return bool(greeting) and "sign in" not in greeting.lower()
@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for Parquet and Arrow output
+    pa = None
+
+from metrics import METRICS
+from normalize import normalize_batch
+from record import FIELDNAMES
+if pa is not None:
+    from normalize import NORMALIZED_SCHEMA
+
+
+class RecordSink:
+    """Base class for writers that stream records to disk as they arrive.
+
+    Writes are thread-safe. Buffered data is flushed every `flush_every`
+    records or `flush_interval` seconds, whichever comes first, so the output
+    can be tailed while the crawl is running.
+    """
+
+    def __init__(self, path, fieldnames=FIELDNAMES, flush_every=50, flush_interval=5.0):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._write(record)
+            self.count += 1
+            self._unflushed += 1
+            if (self._unflushed >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._close()
+
+    def _write(self, record):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TeeSink:
+    """Fans every record out to several sinks."""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    @property
+    def count(self):
+        return self.sinks[0].count if self.sinks else 0
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MetricsSink(RecordSink):
+    """Counts written records by outcome: complete, or N/A when the product page never parsed."""
+
+    def __init__(self, **kwargs):
+        super().__init__(None, **kwargs)
+
+    def _write(self, record):
+        METRICS.increment("records", "success" if record.get("Product Name", "N/A") != "N/A" else "na_fallback")
+
+    def _close(self):
+        pass
+
+
+class CsvSink(RecordSink):
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, quoting=csv.QUOTE_ALL)
+        self._writer.writeheader()
+
+    def _write(self, record):
+        self._writer.writerow(record)
+
+    def _flush(self):
+        self._file.flush()
+        super()._flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlSink(RecordSink):
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write(self, record):
+        self._file.write(json.dumps({key: record.get(key) for key in self.fieldnames}, ensure_ascii=False) + "\n")
+
+    def _flush(self):
+        self._file.flush()
+        super()._flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ColumnarSink(RecordSink):
+    """Buffers records and writes them as Arrow record batches of `row_group_size` rows.
+
+    With normalize=True each batch goes through normalize.normalize_batch and
+    the file gets typed columns (decimal price, float rating, int rank, ...)
+    with nulls instead of "N/A" strings.
+    """
+
+    def __init__(self, path, row_group_size=1000, normalize=False, **kwargs):
+        if pa is None:
+            raise ImportError(f"{type(self).__name__} output needs pyarrow installed: pip install pyarrow")
+        # Row groups are only written whole, the interval flush would make tiny ones
+        kwargs.setdefault("flush_interval", float("inf"))
+        kwargs.setdefault("flush_every", row_group_size)
+        super().__init__(path, **kwargs)
+        self.normalize = normalize
+        if normalize:
+            self.schema = NORMALIZED_SCHEMA
+        else:
+            self.schema = pa.schema([(name, pa.string()) for name in self.fieldnames])
+        self._writer = self._open_writer()
+        self._rows = []
+
+    def _open_writer(self):
+        raise NotImplementedError
+
+    def _to_table(self, rows):
+        if self.normalize:
+            return normalize_batch(rows)
+        columns = {name: [row.get(name) for row in rows] for name in self.fieldnames}
+        return pa.table(columns, schema=self.schema)
+
+    def _write(self, record):
+        self._rows.append(record)
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._to_table(self._rows))
+            self._rows = []
+        super()._flush()
+
+    def _close(self):
+        self._writer.close()
+
+
+class ParquetSink(ColumnarSink):
+    def _open_writer(self):
+        return pq.ParquetWriter(self.path, self.schema)
+
+
+class ArrowSink(ColumnarSink):
+    """Arrow IPC file, readable with pyarrow.ipc.open_file or pyarrow.feather."""
+
+    def _open_writer(self):
+        return pa.ipc.new_file(self.path, self.schema)
+
+
+SINKS = {
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "parquet": ParquetSink,
+    "arrow": ArrowSink,
+}
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+
+def open_sink(path, output_format=None, normalize=False, **kwargs):
+    """Open a sink for path, picking the format from its extension unless given."""
+    if output_format is None:
+        output_format = os.path.splitext(path)[1].lstrip(".").lower() or "csv"
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {sorted(SINKS)}")
+    if normalize:
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Typed output needs a columnar format ({', '.join(COLUMNAR_FORMATS)}), got {output_format!r}")
+        kwargs["normalize"] = True
+    return SINKS[output_format](path, **kwargs)
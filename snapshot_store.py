@@ -0,0 +1,239 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+from metrics import METRICS
+from normalize import parse_number_bought, parse_price, parse_rank, parse_rating
+from record import ProductRecord
+from sinks import RecordSink
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    products_seen INTEGER NOT NULL DEFAULT 0,
+    products_changed INTEGER NOT NULL DEFAULT 0
+);
+
+-- One row per product and category each time something about it changes
+CREATE TABLE IF NOT EXISTS product_history (
+    asin TEXT NOT NULL,
+    category TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    product_name TEXT,
+    price TEXT,
+    rank INTEGER,
+    rank_category TEXT,
+    rating REAL,
+    bought_past_month INTEGER,
+    ship_from TEXT,
+    sold_by TEXT,
+    description TEXT,
+    images TEXT,
+    record_hash TEXT NOT NULL,
+    PRIMARY KEY (asin, category, captured_at)
+);
+CREATE INDEX IF NOT EXISTS idx_history_asin_time ON product_history (asin, captured_at);
+CREATE INDEX IF NOT EXISTS idx_history_category_rank ON product_history (category, rank);
+
+-- Latest known state per product and category, used to decide what changed
+CREATE TABLE IF NOT EXISTS product_latest (
+    asin TEXT NOT NULL,
+    category TEXT NOT NULL,
+    record_hash TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    last_seen_snapshot INTEGER NOT NULL,
+    listing_signature TEXT,
+    detail_fetched_at REAL,
+    record TEXT,
+    PRIMARY KEY (asin, category)
+);
+"""
+
+# Columns added to product_latest after the first release, for incremental refresh
+LATEST_MIGRATIONS = {
+    "listing_signature": "ALTER TABLE product_latest ADD COLUMN listing_signature TEXT",
+    "detail_fetched_at": "ALTER TABLE product_latest ADD COLUMN detail_fetched_at REAL",
+    "record": "ALTER TABLE product_latest ADD COLUMN record TEXT",
+}
+
+INSERT_HISTORY = """
+INSERT OR REPLACE INTO product_history (
+    asin, category, captured_at, snapshot_id, product_name, price, rank, rank_category, rating,
+    bought_past_month, ship_from, sold_by, description, images, record_hash
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _value(record, key):
+    value = record.get(key)
+    return None if value in (None, "N/A") else value
+
+
+def listing_signature(record):
+    """The bestseller grid's rank, price and rating for a product, as a comparable string."""
+    rank = record.get("Listing Rank")
+    price = parse_price(record.get("Product Price"))
+    return json.dumps([
+        rank if rank not in (None, "N/A") else None,
+        str(price) if price is not None else None,
+        parse_rating(record.get("Rating")),
+    ])
+
+
+def snapshot_row(record):
+    """Typed column values for a record, in INSERT_HISTORY order after the key columns."""
+    rank, rank_category = parse_rank(record.get("Best Seller Rating"))
+    price = parse_price(record.get("Product Price"))
+    images = _value(record, "All Available Images")
+    # Sorted so a product whose page only reorders its images is not stored as changed
+    images = "\n".join(sorted(images.split("\n"))) if images else None
+    return (
+        _value(record, "Product Name"),
+        str(price) if price is not None else None,
+        rank,
+        rank_category,
+        parse_rating(record.get("Rating")),
+        parse_number_bought(record.get("Number Bought in the Past Month")),
+        _value(record, "Ship From"),
+        _value(record, "Sold By"),
+        _value(record, "Product Description"),
+        images,
+    )
+
+
+class SnapshotStore(RecordSink):
+    """SQLite history of product records, one snapshot per run.
+
+    Only products that are new or whose values differ from their latest stored
+    row get a history row; unchanged ones just have their last-seen snapshot
+    bumped. Writes are batched into one transaction per flush.
+
+    For incremental refreshes the latest full record is kept with the grid
+    signals it was listed with, so carry_forward() can hand it back instead
+    of loading the product page again.
+    """
+
+    def __init__(self, path, flush_every=200, flush_interval=10.0):
+        super().__init__(path, flush_every=flush_every, flush_interval=flush_interval)
+        self.changed = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(product_latest)")}
+        for column, statement in LATEST_MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(statement)
+        self.refresh_counts = {"carried": 0, "new": 0, "changed": 0, "stale": 0}
+        # Grid signals seen this run, and the products whose records were carried forward
+        self._signatures = {}
+        self._carried = set()
+        self.captured_at = time.time()
+        self.snapshot_id = self._conn.execute(
+            "INSERT INTO snapshots (started_at) VALUES (?)", (self.captured_at,)
+        ).lastrowid
+        self._conn.commit()
+
+    def carry_forward(self, listing_record, max_age):
+        """The stored record for a listed product, or None if its page needs loading again.
+
+        A product is re-fetched when it is new to the category, when its rank,
+        price or rating on the grid moved since it was stored, or when its
+        details were loaded more than `max_age` seconds ago.
+        """
+        asin = listing_record.get("ASIN")
+        category = listing_record.get("Category Name")
+        signature = listing_signature(listing_record)
+        with self._lock:
+            self._signatures[(asin, category)] = signature
+            latest = self._conn.execute(
+                "SELECT listing_signature, detail_fetched_at, record FROM product_latest "
+                "WHERE asin = ? AND category = ?",
+                (asin, category)
+            ).fetchone()
+            if latest is None or latest[2] is None:
+                reason = "new"
+            elif latest[0] != signature:
+                reason = "changed"
+            elif latest[1] is None or time.time() - latest[1] > max_age:
+                reason = "stale"
+            else:
+                reason = "carried"
+                self._carried.add((asin, category))
+            self.refresh_counts[reason] += 1
+        METRICS.increment("incremental_refresh", reason)
+        if reason != "carried":
+            return None
+        record = ProductRecord.from_dict(json.loads(latest[2]))
+        record["Listing Rank"] = listing_record.get("Listing Rank", "N/A")
+        return record
+
+    def _write(self, record):
+        asin = record.get("ASIN")
+        if not asin or _value(record, "Product Name") is None:
+            # Nothing to key on, or the scrape failed: keep the last good state
+            return
+        category = record.get("Category Name")
+        row = snapshot_row(record)
+        record_hash = hashlib.sha1(json.dumps(row, ensure_ascii=False).encode("utf-8")).hexdigest()
+        signature = self._signatures.pop((asin, category), None)
+        # A carried-forward record keeps the time its details were really loaded
+        fetched_at = None if (asin, category) in self._carried else self.captured_at
+        stored = json.dumps(record.to_dict(), ensure_ascii=False)
+        latest = self._conn.execute(
+            "SELECT record_hash FROM product_latest WHERE asin = ? AND category = ?", (asin, category)
+        ).fetchone()
+        if latest is None or latest[0] != record_hash:
+            self._conn.execute(INSERT_HISTORY, (asin, category, self.captured_at, self.snapshot_id) + row + (record_hash,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO product_latest (asin, category, record_hash, captured_at, last_seen_snapshot, "
+                "listing_signature, detail_fetched_at, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (asin, category, record_hash, self.captured_at, self.snapshot_id, signature,
+                 fetched_at or self.captured_at, stored)
+            )
+            self.changed += 1
+        else:
+            self._conn.execute(
+                "UPDATE product_latest SET last_seen_snapshot = ?, "
+                "listing_signature = COALESCE(?, listing_signature), "
+                "detail_fetched_at = COALESCE(?, detail_fetched_at), record = ? "
+                "WHERE asin = ? AND category = ?",
+                (self.snapshot_id, signature, fetched_at, stored, asin, category)
+            )
+
+    def _flush(self):
+        self._conn.commit()
+        super()._flush()
+
+    def _close(self):
+        self._conn.execute(
+            "UPDATE snapshots SET finished_at = ?, products_seen = ?, products_changed = ? WHERE id = ?",
+            (time.time(), self.count, self.changed, self.snapshot_id)
+        )
+        self._conn.commit()
+        self._conn.close()
+        logging.info(
+            f"Snapshot {self.snapshot_id} saved to {self.path}: {self.count} products seen, {self.changed} changed"
+        )
+        if any(self.refresh_counts.values()):
+            counts = self.refresh_counts
+            logging.info(
+                f"Incremental refresh: {counts['carried']} records carried forward; {counts['new']} new, "
+                f"{counts['changed']} changed and {counts['stale']} stale products needed their pages"
+            )
+
+
+def load_history(path, asin):
+    """Stored rows for an ASIN across all snapshots, oldest first."""
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.execute("SELECT * FROM product_history WHERE asin = ? ORDER BY captured_at", (asin,))
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        conn.close()
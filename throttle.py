@@ -0,0 +1,63 @@
+import logging
+import random
+import threading
+import time
+
+from metrics import METRICS
+
+
+class AdaptiveThrottle:
+    """AIMD request-rate controller shared by every fetcher in a run.
+
+    Each clean page load raises the rate by `increase` requests/sec, up to
+    `max_rate`. A timeout, bot check or error page multiplies it by
+    `decrease`, down to `min_rate`. Retries wait an exponentially growing,
+    jittered backoff.
+    """
+
+    def __init__(self, rate=0.5, min_rate=0.05, max_rate=2.0, increase=0.05, decrease=0.5,
+                 base_backoff=2.0, max_backoff=60.0, log_interval=30.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.log_interval = log_interval
+        self.successes = 0
+        self.failures = 0
+        self._next_slot = time.monotonic()
+        self._last_log = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the current rate allows another request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            with METRICS.time("throttle_wait"):
+                time.sleep(slot - now)
+
+    def success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            now = time.monotonic()
+            if now - self._last_log >= self.log_interval:
+                self._last_log = now
+                logging.info(f"Request rate now {self.rate:.2f} req/s ({self.successes} ok, {self.failures} failed)")
+
+    def failure(self, reason):
+        with self._lock:
+            self.failures += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Push the next request out too, so the new rate takes effect immediately
+            self._next_slot = max(self._next_slot, time.monotonic() + 1 / self.rate)
+            logging.warning(f"Backing off to {self.rate:.2f} req/s after {reason}")
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry number `attempt` (0-based), with full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt + 1)))
@@ -0,0 +1,143 @@
+"""
+Per-URL trace spans, written as JSONL while the scraper runs.
+
+Convert a trace to Chrome trace-event format (chrome://tracing or
+https://ui.perfetto.dev) with:
+
+    python tracing.py scrape_trace.jsonl scrape_trace.json
+"""
+import contextvars
+import itertools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# The span that new spans nest under, per thread and per asyncio task
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, span_id, name, trace, parent, attrs):
+        self.id = span_id
+        self.name = name
+        self.trace = trace
+        self.parent = parent
+        self.attrs = attrs
+        self.outcome = "success"
+
+
+class Tracer:
+    """Nested timing spans grouped into one trace per product URL.
+
+    Does nothing until open() is called, so instrumented code costs next to
+    nothing in normal runs. Spans started inside another span inherit its
+    trace; work on other threads joins in when the context is copied over.
+    """
+
+    def __init__(self):
+        self._file = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def current(self):
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name, trace=None, **attrs):
+        """Time the block as a span; pass `trace` (the product URL) to start a new trace."""
+        if self._file is None:
+            yield None
+            return
+        parent = _current_span.get()
+        span = Span(next(self._ids), name, trace or (parent.trace if parent else None), parent, attrs)
+        token = _current_span.set(span)
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.outcome = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._write(span, start, time.perf_counter() - started)
+
+    def record(self, name, start, duration, parent=None, outcome="success", **attrs):
+        """Add a span for work timed elsewhere, such as parsing in a worker process."""
+        if self._file is None:
+            return
+        span = Span(next(self._ids), name, parent.trace if parent else None, parent, attrs)
+        span.outcome = outcome
+        self._write(span, start, duration)
+
+    def _write(self, span, start, duration):
+        line = json.dumps({
+            "trace": span.trace,
+            "span": span.id,
+            "parent": span.parent.id if span.parent else None,
+            "name": span.name,
+            "start": round(start, 6),
+            "duration": round(duration, 6),
+            "thread": threading.current_thread().name,
+            "outcome": span.outcome,
+            "attrs": span.attrs,
+        }, ensure_ascii=False)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+
+def export_chrome_trace(jsonl_path, out_path):
+    """Convert a span JSONL file to Chrome trace-event JSON, one timeline row per product URL."""
+    events = []
+    lanes = {}
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            trace = span["trace"] or "(run)"
+            if trace not in lanes:
+                lanes[trace] = len(lanes) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": lanes[trace], "args": {"name": trace}})
+            events.append({
+                "name": span["name"],
+                "cat": span["outcome"],
+                "ph": "X",
+                "ts": span["start"] * 1e6,
+                "dur": span["duration"] * 1e6,
+                "pid": 1,
+                "tid": lanes[trace],
+                "args": dict(span["attrs"], outcome=span["outcome"], thread=span["thread"]),
+            })
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events) - len(lanes)
+
+
+# Shared by every module in a run
+TRACER = Tracer()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    count = export_chrome_trace(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} spans to {sys.argv[2]}")
@@ -0,0 +1,72 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+
+BASE_URL = "https://www.amazon.in"
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ("ref", "ref_", "psc", "th", "qid", "sr", "keywords", "content-id", "_encoding")
+TRACKING_PREFIXES = ("pf_rd_", "pd_rd_")
+
+ASIN_PATTERN = re.compile(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?#]|$)")
+
+
+def canonical_url(url):
+    """Normalise a URL so the same page always maps to the same string.
+
+    Lowercases scheme and host, drops the fragment, the "/ref=..." path
+    suffix (and the session id Amazon appends after it) and tracking query
+    parameters, and sorts whatever parameters are left.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    ref_index = path.find("/ref=")
+    if ref_index != -1:
+        path = path[:ref_index]
+    path = path.rstrip("/") or "/"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def product_asin(url):
+    """The 10-character ASIN in a product URL, or None."""
+    match = ASIN_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def set_base_url(base_url):
+    """Resolve relative links against another site, e.g. a local stand-in for benchmarks."""
+    global BASE_URL
+    BASE_URL = base_url.rstrip("/")
+
+
+def rebase_url(url, base_url):
+    """The same path and query on another site."""
+    parts = urlsplit(url)
+    base = urlsplit(base_url)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+
+def canonical_product_url(href, base_url=None):
+    """Resolve a product link to "<base>/dp/<ASIN>", dropping slug, ref= and tracking parameters.
+
+    Links without a recognisable ASIN fall back to canonical_url().
+    """
+    url = urljoin(base_url or BASE_URL, href)
+    asin = product_asin(url)
+    if asin is None:
+        return canonical_url(url)
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}/dp/{asin}"
+
+
+def category_page_url(category_url, page):
+    """URL of page `page` (1-based) of a bestseller list."""
+    if page == 1:
+        return category_url
+    parts = urlsplit(category_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != "pg"] + [("pg", str(page))]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
@@ -0,0 +1,437 @@
+"""
+Shared task queue for crawling with a coordinator and several worker processes.
+
+Workers lease a task for a limited time and keep the lease alive with
+heartbeats while they work on it. A lease that runs out (the worker died or
+hung) puts the task back in the queue, so no work is lost; a task that keeps
+failing is given up after `max_attempts` leases. Completing a task pushes its
+records onto a results list for the coordinator and can queue follow-up
+tasks in the same step.
+
+    SqliteQueue  one file, for tests and for several processes on one machine
+    RedisQueue   any Redis-compatible server, for workers on several machines
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the Redis queue backend
+    redis = None
+
+
+class WorkQueue:
+    """Interface shared by the queue backends.
+
+    A task is a dict with "id", "kind", "payload" and "attempts". Task ids are
+    unique: putting an id that was ever queued before does nothing.
+    """
+
+    def __init__(self, max_attempts=3):
+        self.max_attempts = max_attempts
+
+    def put(self, task_id, kind, payload):
+        """Queue a task; returns False if the id is already known."""
+        raise NotImplementedError
+
+    def lease(self, worker_id, lease_seconds=120):
+        """The next queued task, leased to worker_id, or None when nothing is queued."""
+        raise NotImplementedError
+
+    def heartbeat(self, task_id, worker_id, lease_seconds=120):
+        """Extend a lease; returns False if the worker no longer holds it."""
+        raise NotImplementedError
+
+    def complete(self, task_id, worker_id, results=(), tasks=()):
+        """Finish a task, push its results and queue `tasks` ((id, kind, payload) triples).
+
+        Returns False, and changes nothing, if the lease was lost in the meantime.
+        """
+        raise NotImplementedError
+
+    def fail(self, task_id, worker_id, error):
+        """Give a task back to be retried, or give up on it after max_attempts leases."""
+        raise NotImplementedError
+
+    def requeue_expired(self):
+        """Put tasks whose leases ran out back in the queue; returns how many there were."""
+        raise NotImplementedError
+
+    def results(self, after=0, limit=500):
+        """(cursor, result) pairs pushed after `cursor`, oldest first."""
+        raise NotImplementedError
+
+    def counts(self):
+        """Number of tasks that are queued, leased, done and failed."""
+        raise NotImplementedError
+
+    def set_finished(self, finished=True):
+        """Tell workers whether the coordinator has everything it needs."""
+        raise NotImplementedError
+
+    def finished(self):
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every task and result."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, lease_expires);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteQueue(WorkQueue):
+    """Work queue in a SQLite file, shared by every process that opens it.
+
+    Leases are taken inside an immediate transaction, so two processes never
+    get the same task. SQLite locking is unreliable on network filesystems;
+    use RedisQueue for workers on other machines.
+    """
+
+    def __init__(self, path="scrape_queue.db", max_attempts=3):
+        super().__init__(max_attempts)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _insert(self, conn, task_id, kind, payload):
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO tasks (id, kind, payload) VALUES (?, ?, ?)",
+            (task_id, kind, json.dumps(payload, ensure_ascii=False)),
+        )
+        return cursor.rowcount == 1
+
+    def _requeue_expired(self, conn):
+        return conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "error = CASE WHEN attempts >= ? THEN 'lease expired' ELSE error END, "
+            "worker = NULL, lease_expires = NULL "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, time.time()),
+        ).rowcount
+
+    def put(self, task_id, kind, payload):
+        with self._transaction() as conn:
+            return self._insert(conn, task_id, kind, payload)
+
+    def lease(self, worker_id, lease_seconds=120):
+        with self._transaction() as conn:
+            self._requeue_expired(conn)
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM tasks WHERE state = 'queued' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker_id, time.time() + lease_seconds, row[0]),
+            )
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2]), "attempts": row[3] + 1}
+
+    def heartbeat(self, task_id, worker_id, lease_seconds=120):
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (time.time() + lease_seconds, task_id, worker_id),
+            ).rowcount == 1
+
+    def complete(self, task_id, worker_id, results=(), tasks=()):
+        with self._transaction() as conn:
+            held = conn.execute(
+                "UPDATE tasks SET state = 'done', worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (task_id, worker_id),
+            ).rowcount == 1
+            if held:
+                conn.executemany(
+                    "INSERT INTO results (result) VALUES (?)",
+                    [(json.dumps(result, ensure_ascii=False),) for result in results],
+                )
+                for child_id, kind, payload in tasks:
+                    self._insert(conn, child_id, kind, payload)
+            return held
+
+    def fail(self, task_id, worker_id, error):
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = ?, worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (self.max_attempts, error, task_id, worker_id),
+            ).rowcount == 1
+
+    def requeue_expired(self):
+        with self._transaction() as conn:
+            return self._requeue_expired(conn)
+
+    def results(self, after=0, limit=500):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, result FROM results WHERE id > ? ORDER BY id LIMIT ?", (after, limit)
+            ).fetchall()
+        return [(row_id, json.loads(result)) for row_id, result in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(rows)
+        return counts
+
+    def set_finished(self, finished=True):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('finished', ?)", ("1" if finished else "0",)
+            )
+
+    def finished(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'finished'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks")
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM meta")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Redis keeps a hash of task definitions, a list of queued ids and a sorted set
+# of lease expiry times. Every step that touches more than one key is a Lua
+# script, so a worker dying halfway through cannot leave a task in two states.
+
+_PUT_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 1 then
+    redis.call('LPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: leases, owners, attempts, queued, failed  ARGV: now, max attempts
+_REQUEUE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('HDEL', KEYS[2], id)
+    if tonumber(redis.call('HGET', KEYS[3], id) or '0') >= tonumber(ARGV[2]) then
+        redis.call('HSET', KEYS[5], id, 'lease expired')
+    else
+        redis.call('RPUSH', KEYS[4], id)
+    end
+end
+return #expired
+"""
+
+# KEYS: queued, leases, owners, attempts, tasks  ARGV: worker, lease expiry
+_LEASE_SCRIPT = """
+local id = redis.call('RPOP', KEYS[1])
+if not id then
+    return false
+end
+redis.call('ZADD', KEYS[2], ARGV[2], id)
+redis.call('HSET', KEYS[3], id, ARGV[1])
+local attempts = redis.call('HINCRBY', KEYS[4], id, 1)
+return {id, redis.call('HGET', KEYS[5], id), attempts}
+"""
+
+# KEYS: owners, leases  ARGV: task, worker, lease expiry
+_HEARTBEAT_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+return 1
+"""
+
+# KEYS: owners, leases, done, results, tasks, queued
+# ARGV: task, worker, result count, results..., then (id, task) pairs to queue
+_COMPLETE_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[1])
+local count = tonumber(ARGV[3])
+for i = 4, 3 + count do
+    redis.call('RPUSH', KEYS[4], ARGV[i])
+end
+for i = 4 + count, #ARGV, 2 do
+    if redis.call('HSETNX', KEYS[5], ARGV[i], ARGV[i + 1]) == 1 then
+        redis.call('LPUSH', KEYS[6], ARGV[i])
+    end
+end
+return 1
+"""
+
+# KEYS: owners, leases, attempts, queued, failed  ARGV: task, worker, error, max attempts
+_FAIL_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0') >= tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[5], ARGV[1], ARGV[3])
+else
+    redis.call('RPUSH', KEYS[4], ARGV[1])
+end
+return 1
+"""
+
+
+class RedisQueue(WorkQueue):
+    """Work queue on a Redis-compatible server (Redis, Valkey, KeyDB, ...).
+
+    Queues with different `name`s can share one server. Keys carry the name
+    as a hash tag, so on a cluster they all live on the same node, which the
+    scripts need.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", name="scraper", max_attempts=3):
+        if redis is None:
+            raise ImportError("The Redis queue backend needs redis installed: pip install redis")
+        super().__init__(max_attempts)
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._keys = {
+            key: f"{{{name}}}:{key}"
+            for key in ("tasks", "queued", "leases", "owners", "attempts", "done", "failed", "results", "finished")
+        }
+        self._put = self._redis.register_script(_PUT_SCRIPT)
+        self._requeue = self._redis.register_script(_REQUEUE_SCRIPT)
+        self._lease = self._redis.register_script(_LEASE_SCRIPT)
+        self._heartbeat = self._redis.register_script(_HEARTBEAT_SCRIPT)
+        self._complete = self._redis.register_script(_COMPLETE_SCRIPT)
+        self._fail = self._redis.register_script(_FAIL_SCRIPT)
+
+    def _key_list(self, *names):
+        return [self._keys[name] for name in names]
+
+    def put(self, task_id, kind, payload):
+        task = json.dumps({"kind": kind, "payload": payload}, ensure_ascii=False)
+        return self._put(keys=self._key_list("tasks", "queued"), args=[task_id, task]) == 1
+
+    def lease(self, worker_id, lease_seconds=120):
+        self.requeue_expired()
+        leased = self._lease(
+            keys=self._key_list("queued", "leases", "owners", "attempts", "tasks"),
+            args=[worker_id, time.time() + lease_seconds],
+        )
+        if not leased:
+            return None
+        task_id, task, attempts = leased
+        task = json.loads(task)
+        return {"id": task_id, "kind": task["kind"], "payload": task["payload"], "attempts": int(attempts)}
+
+    def heartbeat(self, task_id, worker_id, lease_seconds=120):
+        return self._heartbeat(
+            keys=self._key_list("owners", "leases"), args=[task_id, worker_id, time.time() + lease_seconds]
+        ) == 1
+
+    def complete(self, task_id, worker_id, results=(), tasks=()):
+        results = [json.dumps(result, ensure_ascii=False) for result in results]
+        args = [task_id, worker_id, len(results)] + results
+        for child_id, kind, payload in tasks:
+            args += [child_id, json.dumps({"kind": kind, "payload": payload}, ensure_ascii=False)]
+        return self._complete(
+            keys=self._key_list("owners", "leases", "done", "results", "tasks", "queued"), args=args
+        ) == 1
+
+    def fail(self, task_id, worker_id, error):
+        return self._fail(
+            keys=self._key_list("owners", "leases", "attempts", "queued", "failed"),
+            args=[task_id, worker_id, error, self.max_attempts],
+        ) == 1
+
+    def requeue_expired(self):
+        return self._requeue(
+            keys=self._key_list("leases", "owners", "attempts", "queued", "failed"),
+            args=[time.time(), self.max_attempts],
+        )
+
+    def results(self, after=0, limit=500):
+        # The cursor is a list index, results are never removed while a crawl runs
+        values = self._redis.lrange(self._keys["results"], after, after + limit - 1)
+        return [(after + index + 1, json.loads(value)) for index, value in enumerate(values)]
+
+    def counts(self):
+        pipe = self._redis.pipeline()
+        pipe.llen(self._keys["queued"])
+        pipe.zcard(self._keys["leases"])
+        pipe.scard(self._keys["done"])
+        pipe.hlen(self._keys["failed"])
+        return dict(zip(("queued", "leased", "done", "failed"), pipe.execute()))
+
+    def set_finished(self, finished=True):
+        self._redis.set(self._keys["finished"], "1" if finished else "0")
+
+    def finished(self):
+        return self._redis.get(self._keys["finished"]) == "1"
+
+    def clear(self):
+        self._redis.delete(*self._keys.values())
+
+    def close(self):
+        self._redis.close()
+
+
+def open_queue(url, max_attempts=3):
+    """Open a queue from a URL: redis://host:port/db, sqlite:///path.db or a plain file path."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisQueue(url, max_attempts=max_attempts)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SqliteQueue(url, max_attempts=max_attempts)